@@ -0,0 +1,27 @@
+"""add request shared_request_id
+
+Revision ID: 4e1f0b9c2d7a
+Revises: 7c9c3d5f1a2b
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4e1f0b9c2d7a"
+down_revision = "7c9c3d5f1a2b"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "requests",
+        sa.Column("shared_request_id", sa.dialects.postgresql.UUID(as_uuid=True), nullable=True),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("requests", "shared_request_id")
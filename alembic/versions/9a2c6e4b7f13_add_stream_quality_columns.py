@@ -0,0 +1,30 @@
+"""add stream quality columns
+
+Revision ID: 9a2c6e4b7f13
+Revises: 4e1f0b9c2d7a
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9a2c6e4b7f13"
+down_revision = "4e1f0b9c2d7a"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("requests", sa.Column("ttft_ms", sa.Integer(), nullable=True))
+    op.add_column("requests", sa.Column("mean_itl_ms", sa.Float(), nullable=True))
+    op.add_column("requests", sa.Column("stream_duration_ms", sa.Integer(), nullable=True))
+    op.add_column("requests", sa.Column("output_tokens_per_s", sa.Float(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("requests", "output_tokens_per_s")
+    op.drop_column("requests", "stream_duration_ms")
+    op.drop_column("requests", "mean_itl_ms")
+    op.drop_column("requests", "ttft_ms")
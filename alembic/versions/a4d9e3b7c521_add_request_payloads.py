@@ -0,0 +1,63 @@
+"""add compressed request payload side table
+
+Revision ID: a4d9e3b7c521
+Revises: f7c1d2e8b394
+Create Date: 2026-10-19
+"""
+
+from datetime import datetime, timezone
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "a4d9e3b7c521"
+down_revision = "f7c1d2e8b394"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def upgrade() -> None:
+    op.execute(
+        """
+        CREATE TABLE request_payloads (
+            id UUID NOT NULL,
+            request_id UUID NOT NULL,
+            tenant_id UUID NOT NULL REFERENCES tenants (id),
+            kind VARCHAR(16) NOT NULL,
+            codec VARCHAR(16) NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            truncated BOOLEAN NOT NULL DEFAULT false,
+            data BYTEA NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL DEFAULT now(),
+            CONSTRAINT request_payloads_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+        """
+    )
+    # Already-compressed bytes; skip TOAST's own pglz pass.
+    op.execute("ALTER TABLE request_payloads ALTER COLUMN data SET STORAGE EXTERNAL")
+    now = datetime.now(timezone.utc)
+    month = datetime(now.year, now.month, 1, tzinfo=timezone.utc)
+    for _ in range(MONTHS_AHEAD + 1):
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE request_payloads_{month:%Y_%m} PARTITION OF request_payloads "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+    op.execute("CREATE TABLE request_payloads_default PARTITION OF request_payloads DEFAULT")
+    op.create_index("ix_request_payloads_request_id", "request_payloads", ["request_id"])
+    op.create_index("ix_request_payloads_tenant_created_id", "request_payloads", ["tenant_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_request_payloads_tenant_created_id", table_name="request_payloads")
+    op.drop_index("ix_request_payloads_request_id", table_name="request_payloads")
+    op.execute("DROP TABLE request_payloads CASCADE")
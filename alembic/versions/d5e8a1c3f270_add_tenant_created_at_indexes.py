@@ -0,0 +1,25 @@
+"""add tenant created_at keyset indexes
+
+Revision ID: d5e8a1c3f270
+Revises: 9a2c6e4b7f13
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "d5e8a1c3f270"
+down_revision = "9a2c6e4b7f13"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_requests_tenant_created_id", "requests", ["tenant_id", "created_at", "id"])
+    op.create_index("ix_usage_events_tenant_created_id", "usage_events", ["tenant_id", "created_at", "id"])
+
+
+def downgrade() -> None:
+    op.drop_index("ix_usage_events_tenant_created_id", table_name="usage_events")
+    op.drop_index("ix_requests_tenant_created_id", table_name="requests")
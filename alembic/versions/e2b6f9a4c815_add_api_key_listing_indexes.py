@@ -0,0 +1,34 @@
+"""add api key listing indexes
+
+Revision ID: e2b6f9a4c815
+Revises: d5e8a1c3f270
+Create Date: 2026-10-19
+"""
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = "e2b6f9a4c815"
+down_revision = "d5e8a1c3f270"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_index("ix_api_keys_created_id", "api_keys", ["created_at", "id"])
+    op.create_index("ix_api_keys_tenant_created_id", "api_keys", ["tenant_id", "created_at", "id"])
+    op.create_index("ix_api_keys_active_created_id", "api_keys", ["active", "created_at", "id"])
+    op.create_index(
+        "ix_api_keys_name_pattern",
+        "api_keys",
+        ["name"],
+        postgresql_ops={"name": "varchar_pattern_ops"},
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_api_keys_name_pattern", table_name="api_keys")
+    op.drop_index("ix_api_keys_active_created_id", table_name="api_keys")
+    op.drop_index("ix_api_keys_tenant_created_id", table_name="api_keys")
+    op.drop_index("ix_api_keys_created_id", table_name="api_keys")
@@ -0,0 +1,126 @@
+"""partition requests and usage_events by month
+
+Revision ID: f7c1d2e8b394
+Revises: e2b6f9a4c815
+Create Date: 2026-10-19
+"""
+
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "f7c1d2e8b394"
+down_revision = "e2b6f9a4c815"
+branch_labels = None
+depends_on = None
+
+MONTHS_AHEAD = 3
+LOCK_TIMEOUT = "5s"
+TABLES = ("requests", "usage_events")
+INDEXES = {
+    "requests": [
+        ("ix_requests_tenant_id", ["tenant_id"]),
+        ("ix_requests_created_at", ["created_at"]),
+        ("ix_requests_tenant_created_id", ["tenant_id", "created_at", "id"]),
+    ],
+    "usage_events": [
+        ("ix_usage_events_tenant_id", ["tenant_id"]),
+        ("ix_usage_events_created_at", ["created_at"]),
+        ("ix_usage_events_tenant_created_id", ["tenant_id", "created_at", "id"]),
+    ],
+}
+
+
+def _add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def _month_start(value: datetime) -> datetime:
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def _prepare(table: str, bound: datetime) -> None:
+    # Runs outside a transaction: VALIDATE only takes SHARE UPDATE EXCLUSIVE and the
+    # index is built CONCURRENTLY, so reads and writes continue meanwhile.
+    legacy = f"{table}_legacy"
+    op.execute(
+        f"ALTER TABLE {table} ADD CONSTRAINT {legacy}_bound "
+        f"CHECK (created_at < '{bound.isoformat()}') NOT VALID"
+    )
+    op.execute(f"ALTER TABLE {table} VALIDATE CONSTRAINT {legacy}_bound")
+    op.execute(f"CREATE UNIQUE INDEX CONCURRENTLY {legacy}_pkey ON {table} (id, created_at)")
+
+
+def _swap(table: str, bound: datetime, last: datetime) -> None:
+    # Catalog-only: the existing table becomes the partition covering everything
+    # before `bound`. The validated CHECK lets ATTACH skip its scan, and every
+    # parent index and constraint adopts the matching one on the legacy table.
+    legacy = f"{table}_legacy"
+    op.execute(f"ALTER TABLE {table} DROP CONSTRAINT {table}_pkey")
+    op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {legacy}_pkey PRIMARY KEY USING INDEX {legacy}_pkey")
+    op.execute(f"ALTER TABLE {table} RENAME CONSTRAINT {table}_tenant_id_fkey TO {legacy}_tenant_id_fkey")
+    for name, _ in INDEXES[table]:
+        op.execute(f"ALTER INDEX {name} RENAME TO {name.replace(table, legacy, 1)}")
+    op.execute(f"ALTER TABLE {table} RENAME TO {legacy}")
+
+    op.execute(f"CREATE TABLE {table} (LIKE {legacy} INCLUDING DEFAULTS) PARTITION BY RANGE (created_at)")
+    op.create_primary_key(f"{table}_pkey", table, ["id", "created_at"])
+    op.create_foreign_key(f"{table}_tenant_id_fkey", table, "tenants", ["tenant_id"], ["id"])
+    for name, columns in INDEXES[table]:
+        op.create_index(name, table, columns)
+    op.execute(f"ALTER TABLE {table} ATTACH PARTITION {legacy} FOR VALUES FROM (MINVALUE) TO ('{bound.isoformat()}')")
+    op.execute(f"ALTER TABLE {legacy} DROP CONSTRAINT {legacy}_bound")
+
+    month = bound
+    while month <= last:
+        upper = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE {table}_{month:%Y_%m} PARTITION OF {table} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )
+        month = upper
+    op.execute(f"CREATE TABLE {table}_default PARTITION OF {table} DEFAULT")
+
+
+def _unpartition(table: str) -> None:
+    # Downgrade copies rows back into a plain table and needs a maintenance window.
+    source = f"{table}_partitioned"
+    op.execute(f"ALTER TABLE {table} RENAME TO {source}")
+    op.execute(f"CREATE TABLE {table} (LIKE {source} INCLUDING DEFAULTS)")
+    op.execute(f"INSERT INTO {table} SELECT * FROM {source}")
+    op.execute(f"DROP TABLE {source} CASCADE")
+    op.create_primary_key(f"{table}_pkey", table, ["id"])
+    op.create_foreign_key(f"{table}_tenant_id_fkey", table, "tenants", ["tenant_id"], ["id"])
+    for name, columns in INDEXES[table]:
+        op.create_index(name, table, columns)
+
+
+def upgrade() -> None:
+    now = datetime.now(timezone.utc)
+    # Two months of headroom so rows written between validation and the swap
+    # still satisfy the legacy bound, even across a month boundary.
+    bound = _add_months(_month_start(now), 2)
+    last = _add_months(_month_start(now), MONTHS_AHEAD)
+    op.add_column("tenants", sa.Column("retention_days", sa.Integer(), nullable=True))
+
+    with op.get_context().autocommit_block():
+        for table in TABLES:
+            _prepare(table, bound)
+
+    op.execute(f"SET LOCAL lock_timeout = '{LOCK_TIMEOUT}'")
+    # A foreign key into a partitioned table must include the partition key, so the
+    # usage_events -> requests link is kept at the ORM level only.
+    op.drop_constraint("usage_events_request_id_fkey", "usage_events", type_="foreignkey")
+    for table in TABLES:
+        _swap(table, bound, last)
+
+
+def downgrade() -> None:
+    _unpartition("usage_events")
+    _unpartition("requests")
+    op.create_foreign_key("usage_events_request_id_fkey", "usage_events", "requests", ["request_id"], ["id"])
+    op.drop_column("tenants", "retention_days")
@@ -0,0 +1,68 @@
+from __future__ import annotations
+
+import asyncio
+from typing import Callable
+
+from app.provider import Provider, ProviderResult
+from app.schemas import ChatRequest
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        provider: Provider,
+        max_batch_size: int = 8,
+        max_wait_ms: int = 10,
+        on_batch: Callable[[str, int], None] | None = None,
+    ) -> None:
+        self.provider = provider
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait_ms = max_wait_ms
+        self._pending: dict[str, list[tuple[ChatRequest, asyncio.Future]]] = {}
+        self._timers: dict[str, asyncio.TimerHandle] = {}
+        self._inflight: set[asyncio.Task] = set()
+        self._on_batch = on_batch
+
+    async def submit(self, request: ChatRequest) -> ProviderResult:
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        batch = self._pending.setdefault(request.model, [])
+        batch.append((request, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(request.model)
+        elif len(batch) == 1:
+            self._timers[request.model] = loop.call_later(self.max_wait_ms / 1000, self._flush, request.model)
+        return await future
+
+    def _flush(self, model: str) -> None:
+        timer = self._timers.pop(model, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(model, None)
+        if not batch:
+            return
+        task = asyncio.get_running_loop().create_task(self._dispatch(batch))
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _dispatch(self, batch: list[tuple[ChatRequest, asyncio.Future]]) -> None:
+        live = [(request, future) for request, future in batch if not future.done()]
+        if not live:
+            return
+        if self._on_batch is not None:
+            self._on_batch(live[0][0].model, len(live))
+        try:
+            results = await self.provider.generate_batch([request for request, _ in live])
+        except Exception as exc:
+            results = [exc] * len(live)
+        if len(results) != len(live):
+            # A short or long batch can't be paired safely, so fail every caller rather than hang some.
+            error = RuntimeError(f"generate_batch returned {len(results)} results for {len(live)} requests")
+            results = [error] * len(live)
+        for (_, future), result in zip(live, results):
+            if future.done():
+                continue
+            if isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
@@ -0,0 +1,106 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+
+from app.provider import StreamChunk
+
+
+class BroadcastAborted(Exception):
+    pass
+
+
+class StreamBroadcast:
+    def __init__(self, chunks, owner_request_id: uuid.UUID | None = None, on_finish=None) -> None:
+        self.owner_request_id = owner_request_id
+        self.chunks: list[StreamChunk] = []
+        self.finished = False
+        self.closing = False
+        self.error: Exception | None = None
+        self.subscribers = 0
+        self._upstream = chunks
+        self._on_finish = on_finish
+        self._pump: asyncio.Task | None = None
+        self._changed = asyncio.Event()
+
+    def publish(self, chunk: StreamChunk) -> None:
+        self.chunks.append(chunk)
+        self._notify()
+
+    def finish(self, error: Exception | None = None) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        self.error = error
+        self._notify()
+        if self._on_finish is not None:
+            self._on_finish(self)
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    async def _run(self) -> None:
+        chunks = self._upstream
+        try:
+            async for chunk in chunks:
+                self.publish(chunk)
+                if chunk.done:
+                    break
+            self.finish(None)
+        except asyncio.CancelledError:
+            self.finish(BroadcastAborted("all subscribers left"))
+            raise
+        except Exception as exc:
+            self.finish(exc)
+        finally:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def subscribe(self):
+        self.subscribers += 1
+        # The broadcast owns the upstream; it starts with the first subscriber and
+        # is only canceled once the last one leaves.
+        if self._pump is None:
+            self._pump = asyncio.ensure_future(self._run())
+        index = 0
+        try:
+            while True:
+                while index < len(self.chunks):
+                    chunk = self.chunks[index]
+                    index += 1
+                    yield chunk
+                if self.finished:
+                    if self.error is not None:
+                        raise self.error
+                    return
+                await self._changed.wait()
+        finally:
+            self.subscribers -= 1
+            if self.subscribers == 0 and not self.finished:
+                self.closing = True
+                self._pump.cancel()
+
+
+class BroadcastHub:
+    def __init__(self) -> None:
+        self._streams: dict[str, StreamBroadcast] = {}
+
+    def get(self, key: str) -> StreamBroadcast | None:
+        broadcast = self._streams.get(key)
+        if broadcast is None or broadcast.finished or broadcast.closing:
+            return None
+        return broadcast
+
+    def open(self, key: str, chunks, owner_request_id: uuid.UUID | None = None):
+        broadcast = StreamBroadcast(chunks, owner_request_id, on_finish=lambda done: self.release(key, done))
+        self._streams[key] = broadcast
+        return broadcast.subscribe()
+
+    def release(self, key: str, broadcast: StreamBroadcast) -> None:
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+    def __len__(self) -> int:
+        return len(self._streams)
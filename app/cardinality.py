@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+from starlette.requests import Request
+from starlette.routing import Match
+
+
+class BoundedLabelSet:
+    def __init__(self, max_values: int, overflow: str = "other") -> None:
+        self.max_values = max_values
+        self.overflow = overflow
+        self._seen: set[str] = set()
+
+    def __call__(self, value: str) -> str:
+        if value in self._seen:
+            return value
+        if len(self._seen) < self.max_values:
+            self._seen.add(value)
+            return value
+        return self.overflow
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+
+def route_label(request: Request) -> str:
+    route = request.scope.get("route")
+    path = getattr(route, "path", None)
+    if path:
+        return path
+    # Auth, rate-limit and quota stages answer before routing runs, so resolve the template here.
+    router = getattr(request.scope.get("app"), "router", None)
+    partial = None
+    for candidate in getattr(router, "routes", ()):
+        match, _ = candidate.matches(request.scope)
+        if match == Match.FULL:
+            return getattr(candidate, "path", None) or "unmatched"
+        if match == Match.PARTIAL and partial is None:
+            partial = getattr(candidate, "path", None)
+    return partial or "unmatched"
@@ -1,12 +1,17 @@
 import uuid
+from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Integer, String, Text, func, Index
+from sqlalchemy import Boolean, DateTime, Float, ForeignKey, Integer, LargeBinary, String, Text, func, Index
 from sqlalchemy.dialects.postgresql import UUID
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from app.db.base import Base
 
 
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
 class Tenant(Base):
     __tablename__ = "tenants"
 
@@ -16,6 +21,7 @@ class Tenant(Base):
     created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
     token_limit_per_day: Mapped[int | None] = mapped_column(Integer, nullable=True)
     spend_limit_per_day_usd: Mapped[float | None] = mapped_column(Float, nullable=True)
+    retention_days: Mapped[int | None] = mapped_column(Integer, nullable=True)
 
     api_keys: Mapped[list["ApiKey"]] = relationship(back_populates="tenant")
     requests: Mapped[list["Request"]] = relationship(back_populates="tenant")
@@ -23,6 +29,12 @@ class Tenant(Base):
 
 class ApiKey(Base):
     __tablename__ = "api_keys"
+    __table_args__ = (
+        Index("ix_api_keys_created_id", "created_at", "id"),
+        Index("ix_api_keys_tenant_created_id", "tenant_id", "created_at", "id"),
+        Index("ix_api_keys_active_created_id", "active", "created_at", "id"),
+        Index("ix_api_keys_name_pattern", "name", postgresql_ops={"name": "varchar_pattern_ops"}),
+    )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False)
@@ -39,6 +51,8 @@ class Request(Base):
     __table_args__ = (
         Index("ix_requests_tenant_id", "tenant_id"),
         Index("ix_requests_created_at", "created_at"),
+        Index("ix_requests_tenant_created_id", "tenant_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
@@ -52,11 +66,21 @@ class Request(Base):
     completion_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
     total_tokens: Mapped[int | None] = mapped_column(Integer, nullable=True)
     cost_usd: Mapped[float | None] = mapped_column(Float, nullable=True)
-    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    shared_request_id: Mapped[uuid.UUID | None] = mapped_column(UUID(as_uuid=True), nullable=True)
+    ttft_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    mean_itl_ms: Mapped[float | None] = mapped_column(Float, nullable=True)
+    stream_duration_ms: Mapped[int | None] = mapped_column(Integer, nullable=True)
+    output_tokens_per_s: Mapped[float | None] = mapped_column(Float, nullable=True)
+    created_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=_utcnow, server_default=func.now()
+    )
     completed_at: Mapped[DateTime | None] = mapped_column(DateTime(timezone=True), nullable=True)
 
     tenant: Mapped["Tenant"] = relationship(back_populates="requests")
-    usage_events: Mapped[list["UsageEvent"]] = relationship(back_populates="request")
+    usage_events: Mapped[list["UsageEvent"]] = relationship(
+        back_populates="request",
+        primaryjoin="Request.id == foreign(UsageEvent.request_id)",
+    )
 
 
 class UsageEvent(Base):
@@ -64,17 +88,45 @@ class UsageEvent(Base):
     __table_args__ = (
         Index("ix_usage_events_tenant_id", "tenant_id"),
         Index("ix_usage_events_created_at", "created_at"),
+        Index("ix_usage_events_tenant_created_id", "tenant_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
     )
 
     id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False)
-    request_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("requests.id"), nullable=False)
+    request_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
     model: Mapped[str] = mapped_column(String(100), nullable=False)
     tokens: Mapped[int] = mapped_column(Integer, nullable=False)
     cost_usd: Mapped[float] = mapped_column(Float, nullable=False)
-    created_at: Mapped[DateTime] = mapped_column(DateTime(timezone=True), server_default=func.now())
+    created_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=_utcnow, server_default=func.now()
+    )
 
-    request: Mapped["Request"] = relationship(back_populates="usage_events")
+    request: Mapped["Request"] = relationship(
+        back_populates="usage_events",
+        primaryjoin="foreign(UsageEvent.request_id) == Request.id",
+    )
+
+
+class RequestPayload(Base):
+    __tablename__ = "request_payloads"
+    __table_args__ = (
+        Index("ix_request_payloads_request_id", "request_id"),
+        Index("ix_request_payloads_tenant_created_id", "tenant_id", "created_at", "id"),
+        {"postgresql_partition_by": "RANGE (created_at)"},
+    )
+
+    id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    request_id: Mapped[uuid.UUID] = mapped_column(UUID(as_uuid=True), nullable=False)
+    tenant_id: Mapped[uuid.UUID] = mapped_column(ForeignKey("tenants.id"), nullable=False)
+    kind: Mapped[str] = mapped_column(String(16), nullable=False)
+    codec: Mapped[str] = mapped_column(String(16), nullable=False)
+    size_bytes: Mapped[int] = mapped_column(Integer, nullable=False)
+    truncated: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    data: Mapped[bytes] = mapped_column(LargeBinary, nullable=False)
+    created_at: Mapped[DateTime] = mapped_column(
+        DateTime(timezone=True), primary_key=True, default=_utcnow, server_default=func.now()
+    )
 
 
 class Pricing(Base):
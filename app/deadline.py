@@ -0,0 +1,40 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+class StreamIdleTimeout(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class Deadline:
+    expires_at: float
+
+    @classmethod
+    def after(cls, seconds: float) -> "Deadline":
+        return cls(expires_at=time.monotonic() + seconds)
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+def parse_budget(timeout_header: str | None, deadline_header: str | None) -> float | None:
+    if timeout_header:
+        budget = float(timeout_header)
+    elif deadline_header:
+        budget = float(deadline_header) - time.time()
+    else:
+        return None
+    if not math.isfinite(budget) or budget <= 0:
+        raise ValueError("budget must be a positive finite number of seconds")
+    return budget
@@ -0,0 +1,104 @@
+from __future__ import annotations
+
+import csv
+import io
+import json
+import uuid
+from datetime import datetime
+from typing import Iterator
+
+from sqlalchemy import select, tuple_
+
+from app.db.models import Request as RequestModel
+from app.db.models import UsageEvent
+from app.db.session import get_session
+
+EXPORT_COLUMNS = {
+    "requests": (
+        RequestModel.id,
+        RequestModel.created_at,
+        RequestModel.completed_at,
+        RequestModel.model,
+        RequestModel.status,
+        RequestModel.latency_ms,
+        RequestModel.prompt_tokens,
+        RequestModel.completion_tokens,
+        RequestModel.total_tokens,
+        RequestModel.cost_usd,
+        RequestModel.ttft_ms,
+        RequestModel.shared_request_id,
+    ),
+    "usage_events": (
+        UsageEvent.id,
+        UsageEvent.created_at,
+        UsageEvent.request_id,
+        UsageEvent.model,
+        UsageEvent.tokens,
+        UsageEvent.cost_usd,
+    ),
+}
+EXPORT_MODELS = {"requests": RequestModel, "usage_events": UsageEvent}
+
+
+def _value(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, uuid.UUID):
+        return str(value)
+    return value
+
+
+def export_rows(
+    kind: str,
+    tenant_id: uuid.UUID,
+    start: datetime | None,
+    end: datetime | None,
+    page_size: int = 5000,
+) -> Iterator[tuple]:
+    model = EXPORT_MODELS[kind]
+    columns = EXPORT_COLUMNS[kind]
+    last: tuple | None = None
+    while True:
+        stmt = select(*columns).where(model.tenant_id == tenant_id)
+        if start is not None:
+            stmt = stmt.where(model.created_at >= start)
+        if end is not None:
+            stmt = stmt.where(model.created_at < end)
+        if last is not None:
+            stmt = stmt.where(tuple_(model.created_at, model.id) > tuple_(*last))
+        stmt = stmt.order_by(model.created_at, model.id).limit(page_size)
+
+        # One short transaction per keyset page; rows arrive through a server-side cursor.
+        db = get_session()
+        try:
+            result = db.execute(stmt.execution_options(stream_results=True, yield_per=min(page_size, 1000)))
+            count = 0
+            for row in result:
+                count += 1
+                last = (row.created_at, row.id)
+                yield tuple(row)
+        finally:
+            db.close()
+        if count < page_size:
+            return
+
+
+def encode_rows(kind: str, rows: Iterator[tuple], fmt: str, flush_bytes: int = 65536) -> Iterator[str]:
+    names = [column.key for column in EXPORT_COLUMNS[kind]]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer) if fmt == "csv" else None
+    if writer is not None:
+        writer.writerow(names)
+    for row in rows:
+        values = [_value(value) for value in row]
+        if writer is not None:
+            writer.writerow(["" if value is None else value for value in values])
+        else:
+            buffer.write(json.dumps(dict(zip(names, values)), separators=(",", ":")))
+            buffer.write("\n")
+        if buffer.tell() >= flush_bytes:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
@@ -0,0 +1,83 @@
+from __future__ import annotations
+
+import json
+import logging
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Callable
+
+
+def dumps(payload: dict) -> str:
+    return json.dumps(payload, separators=(",", ":"), default=str)
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record: logging.LogRecord) -> str:
+        if isinstance(record.msg, dict):
+            return dumps(record.msg)
+        return super().format(record)
+
+
+class DroppingQueueHandler(QueueHandler):
+    def __init__(self, log_queue: queue.Queue, on_drop: Callable[[], None] | None = None) -> None:
+        super().__init__(log_queue)
+        self.on_drop = on_drop
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread, not the event loop.
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            if self.on_drop is not None:
+                self.on_drop()
+
+
+class BlockingStopListener(QueueListener):
+    def enqueue_sentinel(self) -> None:
+        self.queue.put(self._sentinel)
+
+
+def setup_queued_logging(logger: logging.Logger, max_queue: int) -> tuple[DroppingQueueHandler, BlockingStopListener]:
+    log_queue: queue.Queue = queue.Queue(maxsize=max_queue)
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter("%(message)s"))
+    handler = DroppingQueueHandler(log_queue)
+    logger.addHandler(handler)
+    listener = BlockingStopListener(log_queue, stream_handler, respect_handler_level=False)
+    listener.start()
+    return handler, listener
+
+
+def parse_sample_rates(raw: str) -> dict[str, float]:
+    rates: dict[str, float] = {}
+    for item in raw.split(","):
+        route, sep, rate = item.strip().rpartition(":")
+        if not sep or not route:
+            continue
+        try:
+            rates[route] = min(max(float(rate), 0.0), 1.0)
+        except ValueError:
+            continue
+    return rates
+
+
+class LogSampler:
+    def __init__(self, rates: dict[str, float], default_rate: float = 1.0, slow_ms: float = 1000.0) -> None:
+        self.rates = rates
+        self.default_rate = default_rate
+        self.slow_ms = slow_ms
+
+    def should_log(self, route: str, status_code: int | None, duration_ms: float) -> bool:
+        if status_code is None or status_code >= 400 or duration_ms >= self.slow_ms:
+            return True
+        rate = self.rates.get(route, self.default_rate)
+        if rate >= 1.0:
+            return True
+        return rate > 0.0 and random.random() < rate
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Callable
+
+
+class LoopMonitor:
+    def __init__(
+        self,
+        interval_s: float = 0.1,
+        block_threshold_s: float = 0.25,
+        max_stalls: int = 50,
+        max_frames: int = 40,
+        on_lag: Callable[[float], None] | None = None,
+        on_stall: Callable[[dict], None] | None = None,
+    ) -> None:
+        self.interval_s = interval_s
+        self.block_threshold_s = block_threshold_s
+        self.max_frames = max_frames
+        self.on_lag = on_lag
+        self.on_stall = on_stall
+        self.stalls: deque[dict] = deque(maxlen=max_stalls)
+        self.max_lag_ms = 0.0
+        self.last_lag_ms = 0.0
+        self._heartbeat = time.monotonic()
+        self._loop_thread_id: int | None = None
+        self._reported_beat: float | None = None
+        self._task: asyncio.Task | None = None
+        self._watchdog: threading.Thread | None = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._tick())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        self._watchdog = None
+
+    async def _tick(self) -> None:
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval_s)
+            lag_s = max(time.perf_counter() - start - self.interval_s, 0.0)
+            self._heartbeat = time.monotonic()
+            lag_ms = lag_s * 1000
+            self.last_lag_ms = lag_ms
+            self.max_lag_ms = max(self.max_lag_ms, lag_ms)
+            if self.on_lag is not None:
+                self.on_lag(lag_s)
+            if self._reported_beat is not None and self.stalls:
+                self.stalls[-1]["lag_ms"] = round(lag_ms, 2)
+                self._reported_beat = None
+
+    def _watch(self) -> None:
+        poll_s = max(self.block_threshold_s / 4, 0.01)
+        while not self._stopped.wait(poll_s):
+            beat = self._heartbeat
+            blocked_s = time.monotonic() - beat - self.interval_s
+            if blocked_s < self.block_threshold_s or self._reported_beat == beat:
+                continue
+            self._reported_beat = beat
+            stall = {
+                "at": time.time(),
+                "blocked_ms": round(blocked_s * 1000, 2),
+                "lag_ms": None,
+                "stack": self._loop_stack(),
+            }
+            self.stalls.append(stall)
+            if self.on_stall is not None:
+                self.on_stall(stall)
+
+    def _loop_stack(self) -> list[str]:
+        frame = sys._current_frames().get(self._loop_thread_id)
+        if frame is None:
+            return []
+        return [
+            f"{entry.filename}:{entry.lineno} {entry.name}"
+            for entry in traceback.extract_stack(frame, limit=self.max_frames)
+        ]
+
+    def report(self) -> dict:
+        return {
+            "interval_ms": self.interval_s * 1000,
+            "block_threshold_ms": self.block_threshold_s * 1000,
+            "last_lag_ms": round(self.last_lag_ms, 2),
+            "max_lag_ms": round(self.max_lag_ms, 2),
+            "stalls": list(reversed(self.stalls)),
+        }
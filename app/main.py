@@ -1,9 +1,11 @@
 import asyncio
+import base64
+from datetime import datetime
 import hashlib
 import json
 import logging
 import os
-import sys
+import threading
 import time
 import uuid
 
@@ -13,27 +15,48 @@ from fastapi.responses import JSONResponse
 from fastapi.responses import Response
 from fastapi.responses import StreamingResponse
 import httpx
-from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, generate_latest, multiprocess
 from redis.asyncio import Redis
-from sqlalchemy import func
+from sqlalchemy import func, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 
+from app.loop_monitor import LoopMonitor
+from app.log_pipeline import LogSampler, parse_sample_rates, setup_queued_logging
+
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_SAMPLE_RATES = os.getenv("LOG_SAMPLE_RATES", "")
+LOG_SAMPLE_DEFAULT = float(os.getenv("LOG_SAMPLE_DEFAULT", "1.0"))
+LOG_SLOW_MS = float(os.getenv("LOG_SLOW_MS", "1000"))
 logger = logging.getLogger("llm-gateway")
 logger.setLevel(logging.INFO)
-_handler = logging.StreamHandler(sys.stdout)
-_handler.setFormatter(logging.Formatter("%(message)s"))
-logger.addHandler(_handler)
+_handler, _log_listener = setup_queued_logging(logger, LOG_QUEUE_SIZE)
 logger.propagate = False
+log_sampler = LogSampler(parse_sample_rates(LOG_SAMPLE_RATES), LOG_SAMPLE_DEFAULT, LOG_SLOW_MS)
 
 from app.db.models import Request as RequestModel
 from app.auth import hash_api_key
+from app.batching import MicroBatcher
+from app.broadcast import BroadcastHub
+from app.cardinality import BoundedLabelSet, route_label
 from app.db.models import ApiKey, Pricing, Tenant, UsageEvent
-from app.db.session import get_session
-from app.mock_provider import MockProvider
+from app.db.session import engine, get_session
+from app.export import encode_rows, export_rows
+from app.deadline import Deadline, DeadlineExceeded, StreamIdleTimeout, parse_budget
+from app.mock_provider import MockProfile, MockProvider
+from app.observability import CoalescingCache, PrometheusClient, label_value
 from app.ollama_provider import OllamaProvider
+from app.pipeline import GatewayPipeline, RequestContext
 from app.pricing import cost_usd
-from app.pricing import merge_pricing
+from app.payloads import PayloadPolicy, PayloadWriter, read_payloads
+from app.pricing import PricingTable
+from app.profiler import ProfilerBusy, StackSampler
 from app.provider import StreamChunk
+from app.replay import ReplayGap, ReplayStore
+from app.retention import maintain_partitions, run_retention
+from app.rolling_metrics import WINDOWS, RollingMetrics
 from app.routing import ProviderHealth, RoutingPolicy
+from app.streaming import DisconnectWatcher, SSEEnvelope, coalesce_chunks
+from app.timing import NULL_TIMER, StageTimer
 from app.schemas import (
     ChatRequest,
     ChatResponse,
@@ -45,6 +68,8 @@ from app.schemas import (
     ObservabilitySummaryResponse,
     LimitsRequest,
     LimitsResponse,
+    RetentionRequest,
+    RetentionResponse,
     UsageSummaryResponse,
     UiKeysTelemetryRequest,
     AdminStatusResponse,
@@ -65,15 +90,23 @@ FALLBACK_FAIL_RATE = float(os.getenv("FALLBACK_FAIL_RATE", "0"))
 OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
 OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.1:8b")
 PROVIDER_MODE = os.getenv("PROVIDER_MODE", "mock")
+MOCK_PROFILE = os.getenv("MOCK_PROFILE", "")
+MOCK_FALLBACK_PROFILE = os.getenv("MOCK_FALLBACK_PROFILE", "")
+
+
+def _mock_profile(raw: str) -> MockProfile | None:
+    return MockProfile(**json.loads(raw)) if raw else None
+
+
 if PROVIDER_MODE == "ollama":
     providers = {
         "primary": OllamaProvider(base_url=OLLAMA_URL),
-        "fallback": MockProvider(delay_ms=100, fail_rate=FALLBACK_FAIL_RATE),
+        "fallback": MockProvider(delay_ms=100, fail_rate=FALLBACK_FAIL_RATE, profile=_mock_profile(MOCK_FALLBACK_PROFILE)),
     }
 else:
     providers = {
-        "primary": MockProvider(delay_ms=200, fail_rate=PRIMARY_FAIL_RATE),
-        "fallback": MockProvider(delay_ms=100, fail_rate=FALLBACK_FAIL_RATE),
+        "primary": MockProvider(delay_ms=200, fail_rate=PRIMARY_FAIL_RATE, profile=_mock_profile(MOCK_PROFILE)),
+        "fallback": MockProvider(delay_ms=100, fail_rate=FALLBACK_FAIL_RATE, profile=_mock_profile(MOCK_FALLBACK_PROFILE)),
     }
 HEALTH_MIN_SAMPLES = int(os.getenv("HEALTH_MIN_SAMPLES", "5"))
 HEALTH_ERROR_THRESHOLD = float(os.getenv("HEALTH_ERROR_THRESHOLD", "0.5"))
@@ -87,6 +120,10 @@ REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
 CACHE_TTL_SECONDS = int(os.getenv("CACHE_TTL_SECONDS", "300"))
 CACHE_VERSION = "v1"
 
+PROMETHEUS_MULTIPROC_DIR = os.getenv("PROMETHEUS_MULTIPROC_DIR")
+METRICS_MAX_TENANT_LABELS = int(os.getenv("METRICS_MAX_TENANT_LABELS", "500"))
+tenant_label = BoundedLabelSet(METRICS_MAX_TENANT_LABELS)
+
 REQUESTS_TOTAL = Counter(
     "http_requests_total",
     "Total HTTP requests",
@@ -112,6 +149,20 @@ TENANT_COST_TOTAL = Counter(
     "Total cost in USD by tenant and tier",
     ["tenant", "tier"],
 )
+LOG_DROPPED_TOTAL = Counter(
+    "log_records_dropped_total",
+    "Log records dropped because the log queue was full",
+)
+_handler.on_drop = LOG_DROPPED_TOTAL.inc
+PAYLOAD_BYTES_TOTAL = Counter(
+    "payload_bytes_total",
+    "Captured request/response payload bytes before and after compression",
+    ["stage"],
+)
+PAYLOAD_DROPPED_TOTAL = Counter(
+    "payload_dropped_total",
+    "Captured payloads dropped because the write queue was full or the write failed",
+)
 RATE_LIMITED_TOTAL = Counter(
     "rate_limited_total",
     "Total requests rate limited",
@@ -148,7 +199,187 @@ CACHE_MISSES_TOTAL = Counter(
     ["tenant", "model"],
 )
 
+BATCH_SIZE = Histogram(
+    "provider_batch_size",
+    "Number of requests dispatched per provider batch",
+    ["provider", "model"],
+    buckets=(1, 2, 4, 8, 16, 32, 64),
+)
+STREAM_DISCONNECTS_TOTAL = Counter(
+    "stream_client_disconnects_total",
+    "Streams whose upstream generation was canceled because the client disconnected",
+    ["provider"],
+)
+STREAM_TTFT = Histogram(
+    "stream_time_to_first_token_seconds",
+    "Time from request start to the gateway yielding the first token frame",
+    ["model", "provider"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 0.75, 1.0, 1.5, 2.5, 5.0, 10.0, 30.0),
+)
+STREAM_INTER_TOKEN = Histogram(
+    "stream_inter_token_seconds",
+    "Gap between consecutive token frames yielded by the gateway",
+    ["model", "provider"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+STREAM_DURATION = Histogram(
+    "stream_duration_seconds",
+    "Total duration of completed streams",
+    ["model", "provider"],
+    buckets=(0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0),
+)
+STREAM_TOKENS_PER_SECOND = Histogram(
+    "stream_output_tokens_per_second",
+    "Output tokens per second after the first token",
+    ["model", "provider"],
+    buckets=(1, 5, 10, 20, 40, 80, 160, 320),
+)
+STAGE_LATENCY = Histogram(
+    "request_stage_duration_seconds",
+    "Time spent per request stage",
+    ["stage"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+)
+EVENT_LOOP_LAG = Histogram(
+    "event_loop_lag_seconds",
+    "Event loop scheduling lag",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
+EVENT_LOOP_STALLS_TOTAL = Counter(
+    "event_loop_stalls_total",
+    "Times the event loop was blocked longer than the stall threshold",
+)
+DEADLINE_EXCEEDED_TOTAL = Counter(
+    "deadline_exceeded_total",
+    "Requests that ran out of time budget",
+    ["endpoint", "reason"],
+)
+STREAM_FANOUT_JOINS_TOTAL = Counter(
+    "stream_fanout_joins_total",
+    "Streams served by joining an identical in-flight upstream generation",
+    ["provider"],
+)
+SSE_FRAMES_PER_STREAM = Histogram(
+    "sse_frames_per_stream",
+    "SSE frames written per stream",
+    ["mode"],
+    buckets=(1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500),
+)
+SSE_BYTES_PER_STREAM = Histogram(
+    "sse_bytes_per_stream",
+    "SSE bytes written per stream",
+    ["mode"],
+    buckets=(256, 1024, 4096, 16384, 65536, 262144, 1048576),
+)
+
 PROMETHEUS_URL = os.getenv("PROMETHEUS_URL", "http://prometheus:9090")
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "false").lower() in ("1", "true", "yes")
+OBSERVABILITY_CACHE_TTL_S = float(os.getenv("OBSERVABILITY_CACHE_TTL_S", "5"))
+prom_client = PrometheusClient(PROMETHEUS_URL)
+summary_cache = CoalescingCache(ttl_s=OBSERVABILITY_CACHE_TTL_S)
+METRICS_SLOT_S = int(os.getenv("METRICS_SLOT_S", "10"))
+METRICS_SYNC_INTERVAL_S = float(os.getenv("METRICS_SYNC_INTERVAL_S", "5"))
+WORKER_ID = f"{os.uname().nodename}:{os.getpid()}"
+rolling_metrics = RollingMetrics(slot_s=METRICS_SLOT_S)
+metrics_sync_task: asyncio.Task | None = None
+KEY_COUNTS_TTL_S = float(os.getenv("KEY_COUNTS_TTL_S", "30"))
+MAX_KEYS_PAGE_SIZE = int(os.getenv("MAX_KEYS_PAGE_SIZE", "1000"))
+key_counts_cache = CoalescingCache(ttl_s=KEY_COUNTS_TTL_S, max_entries=1)
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "5000"))
+PRICING_REFRESH_S = float(os.getenv("PRICING_REFRESH_S", "30"))
+PRICING_VERSION_KEY = "pricing:version"
+PRICING_CHANNEL = "pricing:updates"
+pricing_table = PricingTable()
+pricing_sync_task: asyncio.Task | None = None
+RETENTION_MODE = os.getenv("RETENTION_MODE", "drop")
+RETENTION_DEFAULT_DAYS = int(os.getenv("RETENTION_DEFAULT_DAYS", "0")) or None
+RETENTION_INTERVAL_S = float(os.getenv("RETENTION_INTERVAL_S", "3600"))
+RETENTION_BATCH_SIZE = int(os.getenv("RETENTION_BATCH_SIZE", "5000"))
+RETENTION_LOCK_TIMEOUT_MS = int(os.getenv("RETENTION_LOCK_TIMEOUT_MS", "2000"))
+PARTITION_PREMAKE_MONTHS = int(os.getenv("PARTITION_PREMAKE_MONTHS", "3"))
+PARTITION_MAINTENANCE_INTERVAL_S = float(os.getenv("PARTITION_MAINTENANCE_INTERVAL_S", "3600"))
+retention_task: asyncio.Task | None = None
+partition_task: asyncio.Task | None = None
+PAYLOAD_CAPTURE = os.getenv("PAYLOAD_CAPTURE", "full")
+PAYLOAD_SAMPLE_RATE = float(os.getenv("PAYLOAD_SAMPLE_RATE", "0.1"))
+PAYLOAD_MAX_BYTES = int(os.getenv("PAYLOAD_MAX_BYTES", "4096"))
+PAYLOAD_CODEC = os.getenv("PAYLOAD_CODEC", "zlib")
+PAYLOAD_COMPRESSION_LEVEL = int(os.getenv("PAYLOAD_COMPRESSION_LEVEL", "6"))
+PAYLOAD_QUEUE_SIZE = int(os.getenv("PAYLOAD_QUEUE_SIZE", "10000"))
+
+
+def _on_payload_write(raw_bytes: int, stored_bytes: int) -> None:
+    PAYLOAD_BYTES_TOTAL.labels("raw").inc(raw_bytes)
+    PAYLOAD_BYTES_TOTAL.labels("stored").inc(stored_bytes)
+
+
+payload_writer = PayloadWriter(
+    PayloadPolicy(
+        mode=PAYLOAD_CAPTURE,
+        sample_rate=PAYLOAD_SAMPLE_RATE,
+        max_bytes=PAYLOAD_MAX_BYTES,
+        codec=PAYLOAD_CODEC,
+        level=PAYLOAD_COMPRESSION_LEVEL,
+    ),
+    max_queue=PAYLOAD_QUEUE_SIZE,
+    on_drop=PAYLOAD_DROPPED_TOTAL.inc,
+    on_write=_on_payload_write,
+)
+PROFILER_MAX_SECONDS = float(os.getenv("PROFILER_MAX_SECONDS", "60"))
+profiler = StackSampler(max_seconds=PROFILER_MAX_SECONDS)
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() in ("1", "true", "yes")
+LOOP_LAG_INTERVAL_MS = int(os.getenv("LOOP_LAG_INTERVAL_MS", "100"))
+LOOP_BLOCK_THRESHOLD_MS = int(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "250"))
+
+
+def _on_loop_stall(stall: dict) -> None:
+    EVENT_LOOP_STALLS_TOTAL.inc()
+    logger.warning({"message": "event_loop_blocked", "worker": WORKER_ID, **stall})
+
+
+loop_monitor = LoopMonitor(
+    interval_s=LOOP_LAG_INTERVAL_MS / 1000,
+    block_threshold_s=LOOP_BLOCK_THRESHOLD_MS / 1000,
+    on_lag=EVENT_LOOP_LAG.observe,
+    on_stall=_on_loop_stall,
+)
+
+# 0 = no deadline unless the client sends X-Request-Timeout / X-Request-Deadline.
+DEFAULT_REQUEST_TIMEOUT_S = float(os.getenv("DEFAULT_REQUEST_TIMEOUT_S", "0"))
+MAX_REQUEST_TIMEOUT_S = float(os.getenv("MAX_REQUEST_TIMEOUT_S", "600"))
+DEADLINE_MIN_RETRY_MS = int(os.getenv("DEADLINE_MIN_RETRY_MS", "250"))
+STREAM_IDLE_TIMEOUT_S = float(os.getenv("STREAM_IDLE_TIMEOUT_S", "30"))
+
+STREAM_FANOUT_ENABLED = os.getenv("STREAM_FANOUT_ENABLED", "true").lower() in ("1", "true", "yes")
+stream_hub = BroadcastHub()
+
+STREAM_RESUMABLE_DEFAULT = os.getenv("STREAM_RESUMABLE_DEFAULT", "false").lower() in ("1", "true", "yes")
+STREAM_REPLAY_TTL_S = float(os.getenv("STREAM_REPLAY_TTL_S", "120"))
+STREAM_REPLAY_MAX_EVENTS = int(os.getenv("STREAM_REPLAY_MAX_EVENTS", "4096"))
+STREAM_REPLAY_MAX_BYTES = int(os.getenv("STREAM_REPLAY_MAX_BYTES", str(1024 * 1024)))
+replay_store = ReplayStore(
+    ttl_s=STREAM_REPLAY_TTL_S,
+    max_events=STREAM_REPLAY_MAX_EVENTS,
+    max_bytes=STREAM_REPLAY_MAX_BYTES,
+)
+
+STREAM_MODES = ("token", "coalesce")
+STREAM_MODE_DEFAULT = os.getenv("STREAM_MODE_DEFAULT", "token")
+STREAM_COALESCE_MS = int(os.getenv("STREAM_COALESCE_MS", "25"))
+STREAM_COALESCE_BYTES = int(os.getenv("STREAM_COALESCE_BYTES", "1024"))
+
+BATCH_ENABLED = os.getenv("BATCH_ENABLED", "false").lower() in ("1", "true", "yes")
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_WINDOW_MS = int(os.getenv("BATCH_WINDOW_MS", "10"))
+batchers: dict[str, MicroBatcher] = {}
+if BATCH_ENABLED:
+    for _name, _provider in providers.items():
+        batchers[_name] = MicroBatcher(
+            _provider,
+            max_batch_size=BATCH_MAX_SIZE,
+            max_wait_ms=BATCH_WINDOW_MS,
+            on_batch=lambda model, size, name=_name: BATCH_SIZE.labels(name, model).observe(size),
+        )
 
 
 @app.get("/health")
@@ -158,6 +389,10 @@ def health():
 
 @app.get("/metrics")
 def metrics():
+    if PROMETHEUS_MULTIPROC_DIR:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
     return Response(content=generate_latest(), media_type=CONTENT_TYPE_LATEST)
 
 @app.get("/health/ollama")
@@ -186,11 +421,192 @@ async def close_redis():
         redis_client = None
 
 
+@app.on_event("shutdown")
+async def close_prometheus_client():
+    await prom_client.close()
+
+
+async def _sync_rolling_metrics():
+    own_key = f"metrics:window:{WORKER_ID}"
+    while True:
+        await asyncio.sleep(METRICS_SYNC_INTERVAL_S)
+        if redis_client is None:
+            continue
+        try:
+            await redis_client.set(
+                own_key,
+                json.dumps(rolling_metrics.snapshot(), separators=(",", ":")),
+                ex=max(int(METRICS_SYNC_INTERVAL_S * 3), 1),
+            )
+            peer_keys = [key async for key in redis_client.scan_iter("metrics:window:*") if key != own_key]
+            raw = await redis_client.mget(peer_keys) if peer_keys else []
+            rolling_metrics.load_peers([json.loads(item) for item in raw if item])
+        except Exception as exc:
+            logger.warning({"message": "metrics_sync_failed", "error": str(exc)})
+
+
+@app.on_event("startup")
+async def start_metrics_sync():
+    global metrics_sync_task
+    metrics_sync_task = asyncio.create_task(_sync_rolling_metrics())
+
+
+@app.on_event("shutdown")
+async def stop_metrics_sync():
+    global metrics_sync_task
+    if metrics_sync_task is not None:
+        metrics_sync_task.cancel()
+        metrics_sync_task = None
+
+
+async def _pricing_version() -> int:
+    if redis_client is None:
+        return pricing_table.version
+    return int(await redis_client.get(PRICING_VERSION_KEY) or 0)
+
+
+async def _sync_pricing():
+    while True:
+        pubsub = None
+        try:
+            if redis_client is None:
+                await asyncio.sleep(PRICING_REFRESH_S)
+                continue
+            pubsub = redis_client.pubsub()
+            await pubsub.subscribe(PRICING_CHANNEL)
+            while True:
+                message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=PRICING_REFRESH_S)
+                if message is not None:
+                    update = json.loads(message["data"])
+                    pricing_table.load(update["items"], int(update["version"]))
+                    continue
+                version = await _pricing_version()
+                if version > pricing_table.version:
+                    pricing_table.load(await asyncio.to_thread(_load_pricing_items), version)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning({"message": "pricing_sync_failed", "error": str(exc)})
+            await asyncio.sleep(PRICING_REFRESH_S)
+        finally:
+            if pubsub is not None:
+                await pubsub.aclose()
+
+
+@app.on_event("startup")
+async def load_pricing():
+    global pricing_sync_task
+    try:
+        version = await _pricing_version()
+    except Exception as exc:
+        logger.warning({"message": "pricing_version_unavailable", "error": str(exc)})
+        version = 0
+    pricing_table.load(await asyncio.to_thread(_load_pricing_items), version)
+    pricing_sync_task = asyncio.create_task(_sync_pricing())
+
+
+@app.on_event("shutdown")
+async def stop_pricing_sync():
+    global pricing_sync_task
+    if pricing_sync_task is not None:
+        pricing_sync_task.cancel()
+        pricing_sync_task = None
+
+
+async def _run_retention():
+    while True:
+        try:
+            report = await asyncio.to_thread(
+                run_retention,
+                engine,
+                mode=RETENTION_MODE,
+                default_days=RETENTION_DEFAULT_DAYS,
+                batch_size=RETENTION_BATCH_SIZE,
+                lock_timeout_ms=RETENTION_LOCK_TIMEOUT_MS,
+            )
+            if any(report.get(key) for key in ("retired", "deferred", "deleted_rows", "archived_rows")):
+                logger.info({"message": "retention_run", **report})
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning({"message": "retention_failed", "error": str(exc)})
+        await asyncio.sleep(RETENTION_INTERVAL_S)
+
+
+@app.on_event("startup")
+async def start_retention():
+    global retention_task
+    if RETENTION_INTERVAL_S > 0:
+        retention_task = asyncio.create_task(_run_retention())
+
+
+@app.on_event("shutdown")
+async def stop_retention():
+    global retention_task
+    if retention_task is not None:
+        retention_task.cancel()
+        retention_task = None
+
+
+async def _run_partition_maintenance():
+    while True:
+        try:
+            report = await asyncio.to_thread(maintain_partitions, engine, months_ahead=PARTITION_PREMAKE_MONTHS)
+            if report.get("created"):
+                logger.info({"message": "partitions_created", **report})
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning({"message": "partition_maintenance_failed", "error": str(exc)})
+        await asyncio.sleep(PARTITION_MAINTENANCE_INTERVAL_S)
+
+
+@app.on_event("startup")
+async def start_partition_maintenance():
+    global partition_task
+    if PARTITION_MAINTENANCE_INTERVAL_S > 0:
+        partition_task = asyncio.create_task(_run_partition_maintenance())
+
+
+@app.on_event("shutdown")
+async def stop_partition_maintenance():
+    global partition_task
+    if partition_task is not None:
+        partition_task.cancel()
+        partition_task = None
+
+
+@app.on_event("startup")
+async def start_payload_writer():
+    payload_writer.start()
+
+
+@app.on_event("shutdown")
+async def stop_payload_writer():
+    await payload_writer.stop()
+
+
+@app.on_event("startup")
+async def start_loop_monitor():
+    if LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_monitor():
+    await loop_monitor.stop()
+
+
+@app.on_event("shutdown")
+def flush_logs():
+    _log_listener.stop()
+
+
 @app.on_event("startup")
 def ensure_admin_key():
     admin_key = os.getenv("ADMIN_API_KEY")
     if not admin_key:
-        logger.warning(json.dumps({"message": "admin_key_missing"}))
+        logger.warning({"message": "admin_key_missing"})
         return
 
     db = get_session()
@@ -207,22 +623,52 @@ def ensure_admin_key():
         if existing is None:
             db.add(ApiKey(tenant_id=admin_tenant.id, key_hash=key_hash, active=True))
             db.commit()
-        total_keys = db.query(ApiKey).count()
-        active_keys = db.query(ApiKey).filter(ApiKey.active.is_(True)).count()
+        total_keys, active_keys = _api_key_counts(db)
         logger.info(
-            json.dumps(
-                {
-                    "message": "api_keys_count",
-                    "sql_total": int(total_keys),
-                    "sql_active": int(active_keys),
-                },
-                separators=(",", ":"),
-            )
+            {
+                "message": "api_keys_count",
+                "sql_total": int(total_keys),
+                "sql_active": int(active_keys),
+            }
         )
     finally:
         db.close()
 
 
+def _api_key_counts(db) -> tuple[int, int]:
+    total, active = db.query(
+        func.count(ApiKey.id),
+        func.count(ApiKey.id).filter(ApiKey.active.is_(True)),
+    ).one()
+    return int(total or 0), int(active or 0)
+
+
+def _load_api_key_counts() -> tuple[int, int]:
+    db = get_session()
+    try:
+        return _api_key_counts(db)
+    finally:
+        db.close()
+
+
+async def _cached_api_key_counts() -> tuple[int, int]:
+    return await key_counts_cache.get("api_keys", lambda: asyncio.to_thread(_load_api_key_counts))
+
+
+def _encode_key_cursor(created_at, key_id) -> str:
+    raw = json.dumps([created_at.isoformat(), str(key_id)], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_key_cursor(cursor: str) -> tuple[datetime, uuid.UUID]:
+    raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+    value = json.loads(raw)
+    if not (isinstance(value, list) and len(value) == 2 and all(isinstance(item, str) for item in value)):
+        raise ValueError("malformed cursor")
+    created_at, key_id = value
+    return datetime.fromisoformat(created_at), uuid.UUID(key_id)
+
+
 def _get_admin_tenant_id():
     db = get_session()
     try:
@@ -269,22 +715,28 @@ def _rotate_admin_key() -> str:
     return raw_key
 
 
-def _get_pricing_map() -> dict:
+def _pricing_items(db) -> list[dict]:
+    return [
+        {
+            "model": row.model,
+            "input_per_1k": row.input_per_1k,
+            "output_per_1k": row.output_per_1k,
+            "cached_per_1k": row.cached_per_1k,
+        }
+        for row in db.query(Pricing).all()
+    ]
+
+
+def _load_pricing_items() -> list[dict]:
     db = get_session()
     try:
-        rows = db.query(Pricing).all()
-        items = [
-            {
-                "model": row.model,
-                "input_per_1k": row.input_per_1k,
-                "output_per_1k": row.output_per_1k,
-                "cached_per_1k": row.cached_per_1k,
-            }
-            for row in rows
-        ]
+        return _pricing_items(db)
     finally:
         db.close()
-    return merge_pricing(items)
+
+
+def _get_pricing_map():
+    return pricing_table.snapshot
 
 
 def _cacheable_request(payload: ChatRequest) -> bool:
@@ -304,6 +756,10 @@ def _cache_key(tenant_id: str | None, payload: ChatRequest) -> str:
     return f"cache:chat:{CACHE_VERSION}:{tenant_part}:{digest}"
 
 
+def _shareable_stream(payload: ChatRequest) -> bool:
+    return STREAM_FANOUT_ENABLED and payload.temperature in (None, 0)
+
+
 def _estimate_tokens(messages: list, content: str) -> int:
     text = " ".join([getattr(m, "content", "") for m in messages]) + " " + content
     return max(1, len(text) // 4)
@@ -313,23 +769,106 @@ def _format_sse(payload: dict) -> str:
     return f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
 
 
+def _request_deadline(request: Request) -> Deadline | None:
+    budget = parse_budget(
+        request.headers.get("X-Request-Timeout"),
+        request.headers.get("X-Request-Deadline"),
+    )
+    if budget is None and DEFAULT_REQUEST_TIMEOUT_S > 0:
+        budget = DEFAULT_REQUEST_TIMEOUT_S
+    if budget is None:
+        return None
+    if MAX_REQUEST_TIMEOUT_S > 0:
+        budget = min(budget, MAX_REQUEST_TIMEOUT_S)
+    return Deadline.after(budget)
+
+
+def _can_retry(deadline: Deadline | None) -> bool:
+    return deadline is None or deadline.remaining() * 1000 >= DEADLINE_MIN_RETRY_MS
+
+
+def _deadline_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=504,
+        content={"error": {"code": "deadline_exceeded", "message": "Request deadline exceeded"}},
+    )
+
+
+def _stream_error(exc: Exception) -> dict:
+    if isinstance(exc, DeadlineExceeded):
+        return {"code": "deadline_exceeded", "message": "Request deadline exceeded"}
+    if isinstance(exc, StreamIdleTimeout):
+        return {"code": "stream_idle_timeout", "message": "Upstream stopped producing tokens"}
+    return {"code": "stream_error", "message": "Stream failed"}
+
+
+def _invalid_deadline_response() -> JSONResponse:
+    return JSONResponse(
+        status_code=400,
+        content={"error": {"code": "invalid_request", "message": "Invalid timeout or deadline header"}},
+    )
+
+
+def _stage_timer(request: Request) -> StageTimer:
+    return getattr(request.state, "timer", NULL_TIMER)
+
+
+def _record_chat_failure(tenant, model_name: str | None, provider: str | None, start: float) -> None:
+    rolling_metrics.record(
+        tenant.name if tenant is not None else "unknown",
+        model_name or "unknown",
+        provider or "unknown",
+        (time.perf_counter() - start) * 1000,
+        False,
+    )
+
+
+async def _generate(provider_name: str, payload: ChatRequest, deadline: Deadline | None = None):
+    batcher = batchers.get(provider_name)
+    if batcher is not None:
+        call = batcher.submit(payload)
+    else:
+        call = providers[provider_name].generate(payload)
+    if deadline is None:
+        return await call
+    if deadline.expired():
+        call.close()
+        raise DeadlineExceeded()
+    try:
+        async with asyncio.timeout(deadline.remaining()) as scope:
+            return await call
+    except TimeoutError:
+        # Provider-side timeouts with budget left stay retryable via fallback.
+        if scope.expired() or deadline.expired():
+            raise DeadlineExceeded()
+        raise
+
+
 @app.post("/v1/chat", response_model=ChatResponse)
 async def chat(payload: ChatRequest, request: Request, response: Response):
+    try:
+        deadline = _request_deadline(request)
+    except ValueError:
+        return _invalid_deadline_response()
+    timer = _stage_timer(request)
     db = get_session()
     req_row = None
     start = time.perf_counter()
+    tenant = None
+    model_name = None
+    used_provider = None
     try:
-        tenant_id = getattr(request.state, "tenant_id", None)
-        tenant = None
-        if tenant_id is not None:
-            tenant = db.query(Tenant).filter(Tenant.id == tenant_id).one_or_none()
-        if tenant is None:
-            tenant = db.query(Tenant).filter(Tenant.name == "default").one_or_none()
+        with timer.stage("db"):
+            tenant_id = getattr(request.state, "tenant_id", None)
+            if tenant_id is not None:
+                tenant = db.query(Tenant).filter(Tenant.id == tenant_id).one_or_none()
             if tenant is None:
-                tenant = Tenant(name="default")
-                db.add(tenant)
-                db.commit()
-                db.refresh(tenant)
+                tenant = db.query(Tenant).filter(Tenant.name == "default").one_or_none()
+                if tenant is None:
+                    tenant = Tenant(name="default")
+                    db.add(tenant)
+                    db.commit()
+                    db.refresh(tenant)
 
         decision = routing_policy.choose(tenant.tier, health_tracker)
         model_name = decision.model
@@ -342,23 +881,29 @@ async def chat(payload: ChatRequest, request: Request, response: Response):
         cache_entry = None
         if redis_client is not None and _cacheable_request(routed_payload):
             cache_key = _cache_key(tenant.id, routed_payload)
-            cached_raw = await redis_client.get(cache_key)
+            with timer.stage("cache_lookup"):
+                cached_raw = await redis_client.get(cache_key)
             if cached_raw:
                 cache_status = "hit"
-                CACHE_HITS_TOTAL.labels(tenant.name, model_name).inc()
+                CACHE_HITS_TOTAL.labels(tenant_label(tenant.name), model_name).inc()
                 cache_entry = json.loads(cached_raw)
             else:
                 cache_status = "miss"
-                CACHE_MISSES_TOTAL.labels(tenant.name, model_name).inc()
+                CACHE_MISSES_TOTAL.labels(tenant_label(tenant.name), model_name).inc()
 
+        request_row_id = uuid.uuid4()
         req_row = RequestModel(
+            id=request_row_id,
             tenant_id=tenant.id,
             model=model_name,
             status="in_progress",
-            request_payload=routed_payload.model_dump_json(),
         )
-        db.add(req_row)
-        db.commit()
+        # Read before the commit expires the instance, so no refresh holds a connection.
+        row_tenant_id = tenant.id
+        with timer.stage("db"):
+            db.add(req_row)
+            db.commit()
+        payload_writer.submit(request_row_id, row_tenant_id, "request", routed_payload.model_dump_json())
         used_provider = decision.provider
         route_reason = decision.reason
         if cache_entry is not None:
@@ -367,7 +912,8 @@ async def chat(payload: ChatRequest, request: Request, response: Response):
             completion_tokens = int(cache_entry.get("completion_tokens") or 0)
             total_tokens = int(cache_entry.get("total_tokens") or 0)
             cached_tokens = total_tokens
-            pricing_map = _get_pricing_map()
+            with timer.stage("pricing"):
+                pricing_map = _get_pricing_map()
             cost_value = cost_usd(
                 model_name,
                 prompt_tokens,
@@ -378,28 +924,30 @@ async def chat(payload: ChatRequest, request: Request, response: Response):
             used_provider = "cache"
             route_reason = "cache_hit"
         else:
-            provider = providers[decision.provider]
-            try:
-                result = await provider.generate(routed_payload)
-                response_obj = result.response
-                health_tracker.record(decision.provider, True)
-            except Exception:
-                health_tracker.record(decision.provider, False)
-                fallback_provider = decision.fallback_provider
-                if fallback_provider is None:
-                    raise
-                FALLBACK_TOTAL.labels("primary_error", decision.provider, fallback_provider).inc()
-                provider = providers[fallback_provider]
-                used_provider = fallback_provider
-                result = await provider.generate(routed_payload)
-                response_obj = result.response
-                health_tracker.record(fallback_provider, True)
+            with timer.stage("provider"):
+                try:
+                    result = await _generate(decision.provider, routed_payload, deadline)
+                    response_obj = result.response
+                    health_tracker.record(decision.provider, True)
+                except Exception:
+                    health_tracker.record(decision.provider, False)
+                    fallback_provider = decision.fallback_provider
+                    if fallback_provider is None:
+                        raise
+                    if not _can_retry(deadline):
+                        raise DeadlineExceeded()
+                    FALLBACK_TOTAL.labels("primary_error", decision.provider, fallback_provider).inc()
+                    used_provider = fallback_provider
+                    result = await _generate(fallback_provider, routed_payload, deadline)
+                    response_obj = result.response
+                    health_tracker.record(fallback_provider, True)
             if decision.reason == "primary_unhealthy" and decision.fallback_provider:
                 FALLBACK_TOTAL.labels("primary_unhealthy", decision.fallback_provider, decision.provider).inc()
             prompt_tokens = result.prompt_tokens
             completion_tokens = result.completion_tokens
             total_tokens = result.total_tokens
-            pricing_map = _get_pricing_map()
+            with timer.stage("pricing"):
+                pricing_map = _get_pricing_map()
             cost_value = cost_usd(
                 model_name,
                 prompt_tokens,
@@ -415,37 +963,49 @@ async def chat(payload: ChatRequest, request: Request, response: Response):
                     "total_tokens": total_tokens,
                     "cost_usd": cost_value,
                 }
-                await redis_client.set(
-                    cache_key,
-                    json.dumps(cache_payload, separators=(",", ":")),
-                    ex=CACHE_TTL_SECONDS,
-                )
+                with timer.stage("cache_store"):
+                    await redis_client.set(
+                        cache_key,
+                        json.dumps(cache_payload, separators=(",", ":")),
+                        ex=CACHE_TTL_SECONDS,
+                    )
 
         elapsed_ms = int((time.perf_counter() - start) * 1000)
         req_row.status = "completed"
-        req_row.response_payload = response_obj.model_dump_json()
+        payload_writer.submit(request_row_id, tenant.id, "response", response_obj.model_dump_json())
         req_row.latency_ms = elapsed_ms
         req_row.prompt_tokens = prompt_tokens
         req_row.completion_tokens = completion_tokens
         req_row.total_tokens = total_tokens
         req_row.cost_usd = cost_value
         req_row.completed_at = func.now()
-        db.add(req_row)
-        usage = UsageEvent(
-            tenant_id=tenant.id,
-            request_id=req_row.id,
-            model=model_name,
-            tokens=req_row.total_tokens,
-            cost_usd=req_row.cost_usd or 0.0,
-        )
-        db.add(usage)
-        db.commit()
+        with timer.stage("db"):
+            db.add(req_row)
+            usage = UsageEvent(
+                tenant_id=tenant.id,
+                request_id=req_row.id,
+                model=model_name,
+                tokens=req_row.total_tokens,
+                cost_usd=req_row.cost_usd or 0.0,
+            )
+            db.add(usage)
+            db.commit()
 
         TOKENS_TOTAL.labels(model_name).inc(req_row.total_tokens or 0)
         COST_TOTAL.labels(model_name).inc(req_row.cost_usd or 0.0)
-        TENANT_REQUESTS_TOTAL.labels(tenant.name, tenant.tier).inc()
-        TENANT_TOKENS_TOTAL.labels(tenant.name, tenant.tier).inc(req_row.total_tokens or 0)
-        TENANT_COST_TOTAL.labels(tenant.name, tenant.tier).inc(req_row.cost_usd or 0.0)
+        TENANT_REQUESTS_TOTAL.labels(tenant_label(tenant.name), tenant.tier).inc()
+        TENANT_TOKENS_TOTAL.labels(tenant_label(tenant.name), tenant.tier).inc(req_row.total_tokens or 0)
+        TENANT_COST_TOTAL.labels(tenant_label(tenant.name), tenant.tier).inc(req_row.cost_usd or 0.0)
+        rolling_metrics.record(
+            tenant.name,
+            model_name,
+            used_provider,
+            elapsed_ms,
+            True,
+            tokens=total_tokens,
+            cost=cost_value,
+            cache_hit=None if cache_status == "bypass" else cache_status == "hit",
+        )
         response.headers["X-Model-Chosen"] = model_name
         if route_reason != "cache_hit":
             route_reason = "primary_error" if used_provider != decision.provider else decision.reason
@@ -453,7 +1013,18 @@ async def chat(payload: ChatRequest, request: Request, response: Response):
         response.headers["X-Provider"] = used_provider
         response.headers["X-Cache"] = cache_status
         return response_obj
+    except DeadlineExceeded:
+        DEADLINE_EXCEEDED_TOTAL.labels("chat", "deadline").inc()
+        _record_chat_failure(tenant, model_name, used_provider, start)
+        if req_row is not None:
+            req_row.status = "timeout"
+            req_row.latency_ms = int((time.perf_counter() - start) * 1000)
+            req_row.completed_at = func.now()
+            db.add(req_row)
+            db.commit()
+        return _deadline_response()
     except Exception:
+        _record_chat_failure(tenant, model_name, used_provider, start)
         if req_row is not None:
             req_row.status = "failed"
             req_row.completed_at = func.now()
@@ -464,8 +1035,78 @@ async def chat(payload: ChatRequest, request: Request, response: Response):
         db.close()
 
 
+def _record_stream_quality(
+    req_row: RequestModel,
+    model_name: str,
+    provider: str,
+    start: float,
+    first_token_at: float | None,
+    last_token_at: float | None,
+    gap_total: float,
+    gap_count: int,
+    completion_tokens: int,
+) -> None:
+    duration = time.perf_counter() - start
+    STREAM_DURATION.labels(model_name, provider).observe(duration)
+    req_row.stream_duration_ms = int(duration * 1000)
+    if first_token_at is None:
+        return
+    req_row.ttft_ms = int((first_token_at - start) * 1000)
+    if gap_count:
+        req_row.mean_itl_ms = gap_total / gap_count * 1000
+    decode_seconds = (last_token_at or first_token_at) - first_token_at
+    if decode_seconds > 0 and completion_tokens:
+        tokens_per_s = completion_tokens / decode_seconds
+        req_row.output_tokens_per_s = tokens_per_s
+        STREAM_TOKENS_PER_SECOND.labels(model_name, provider).observe(tokens_per_s)
+
+
+async def _follow_replay(buffer, after_seq: int):
+    try:
+        async for frame in buffer.follow(after_seq):
+            yield frame
+    except ReplayGap:
+        yield _format_sse(
+            {"error": {"code": "replay_gap", "message": "Stream fell behind and buffered events were evicted"}}
+        )
+
+
+def _resume_stream(last_event_id: str, request: Request):
+    stream_id, _, seq_raw = last_event_id.rpartition(":")
+    try:
+        after_seq = int(seq_raw)
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": "invalid_request", "message": "Invalid Last-Event-ID"}},
+        )
+    buffer = replay_store.get(stream_id)
+    if buffer is None or buffer.tenant_id != str(getattr(request.state, "tenant_id", None)):
+        return JSONResponse(
+            status_code=404,
+            content={"error": {"code": "not_found", "message": "Stream not found or expired"}},
+        )
+    if not buffer.can_resume(after_seq):
+        return JSONResponse(
+            status_code=409,
+            content={"error": {"code": "resume_unavailable", "message": "Requested events are no longer buffered"}},
+        )
+    stream = StreamingResponse(_follow_replay(buffer, after_seq), media_type="text/event-stream")
+    stream.headers["Cache-Control"] = "no-cache"
+    stream.headers["X-Accel-Buffering"] = "no"
+    stream.headers["X-Stream-Resumed"] = "true"
+    return stream
+
+
 @app.post("/v1/chat/stream")
 async def chat_stream(payload: ChatRequest, request: Request):
+    last_event_id = request.headers.get("Last-Event-ID")
+    if last_event_id:
+        return _resume_stream(last_event_id, request)
+    try:
+        deadline = _request_deadline(request)
+    except ValueError:
+        return _invalid_deadline_response()
     db = get_session()
     req_row = None
     start = time.perf_counter()
@@ -479,38 +1120,82 @@ async def chat_stream(payload: ChatRequest, request: Request):
     completed = False
     canceled = False
     failed = False
+    timed_out = False
     done_sent = False
+    request_row_id = uuid.uuid4()
+    first_token_at = None
+    last_token_at = None
+    token_gap_total = 0.0
+    token_gap_count = 0
+    share_key = None
+    shared_from = None
+    stream_mode = (request.headers.get("X-Stream-Mode") or STREAM_MODE_DEFAULT).strip().lower()
+    if stream_mode not in STREAM_MODES:
+        stream_mode = "token"
+    resumable_header = request.headers.get("X-Stream-Resumable")
+    if resumable_header is None:
+        resumable = STREAM_RESUMABLE_DEFAULT
+    else:
+        resumable = resumable_header.strip().lower() in ("1", "true", "yes")
+    watcher = DisconnectWatcher(request.receive)
+
+    def _upstream(provider_name: str, routed_payload: ChatRequest):
+        nonlocal shared_from
+        provider = providers[provider_name]
+        if share_key is None:
+            return provider.stream(routed_payload)
+        key = f"{share_key}:{provider_name}"
+        broadcast = stream_hub.get(key)
+        if broadcast is None:
+            shared_from = None
+            return stream_hub.open(key, provider.stream(routed_payload), owner_request_id=request_row_id)
+        shared_from = broadcast.owner_request_id
+        STREAM_FANOUT_JOINS_TOTAL.labels(provider_name).inc()
+        return broadcast.subscribe()
+
+    def _record_health(provider_name: str, success: bool) -> None:
+        if shared_from is None:
+            health_tracker.record(provider_name, success)
 
     async def _stream_from(provider_name: str, routed_payload: ChatRequest, model_name: str):
-        nonlocal done_sent
-        provider = providers[provider_name]
-        async for chunk in provider.stream(routed_payload):
-            if await request.is_disconnected():
-                raise asyncio.CancelledError()
+        nonlocal done_sent, first_token_at, last_token_at, token_gap_total, token_gap_count
+        envelope = SSEEnvelope(response_id, model_name, created)
+        inter_token = STREAM_INTER_TOKEN.labels(model_name, provider_name)
+        chunks = watcher.guard(_upstream(provider_name, routed_payload), STREAM_IDLE_TIMEOUT_S or None, deadline)
+        if stream_mode == "coalesce":
+            chunks = coalesce_chunks(chunks, STREAM_COALESCE_MS, STREAM_COALESCE_BYTES)
+        async for chunk in chunks:
             if chunk.content:
+                # Taken when the frame is yielded, before the socket write, not on client receipt.
+                now = time.perf_counter()
+                if first_token_at is None:
+                    first_token_at = now
+                    STREAM_TTFT.labels(model_name, provider_name).observe(now - start)
+                else:
+                    gap = now - last_token_at
+                    token_gap_total += gap
+                    token_gap_count += 1
+                    inter_token.observe(gap)
+                last_token_at = now
                 content_parts.append(chunk.content)
-                yield _format_sse(
-                    {
-                        "id": response_id,
-                        "model": model_name,
-                        "created": created,
-                        "content": chunk.content,
-                        "done": False,
-                    }
-                )
+                yield envelope.content(chunk.content)
             if chunk.done:
                 done_sent = True
                 yield chunk
                 return
 
     async def _event_generator():
-        nonlocal used_provider, prompt_tokens, completion_tokens, total_tokens, completed, canceled, failed
+        nonlocal used_provider, prompt_tokens, completion_tokens, total_tokens, completed, canceled, failed, timed_out
+        nonlocal share_key
         req_row = None
+        tenant = None
         model_name = None
         routed_payload = None
+        if not resumable:
+            # Resumable streams keep generating after a disconnect so clients can reconnect.
+            watcher.start()
         try:
             tenant_id = getattr(request.state, "tenant_id", None)
-            tenant = None
             if tenant_id is not None:
                 tenant = db.query(Tenant).filter(Tenant.id == tenant_id).one_or_none()
             if tenant is None:
@@ -527,15 +1212,19 @@ async def chat_stream(payload: ChatRequest, request: Request):
                 model_name = OLLAMA_MODEL
             routed_payload = payload.model_copy(update={"model": model_name, "stream": True})
             used_provider = decision.provider
+            if _shareable_stream(routed_payload):
+                share_key = _cache_key(tenant.id, routed_payload)
 
             req_row = RequestModel(
+                id=request_row_id,
                 tenant_id=tenant.id,
                 model=model_name,
                 status="in_progress",
-                request_payload=routed_payload.model_dump_json(),
             )
+            row_tenant_id = tenant.id
             db.add(req_row)
             db.commit()
+            payload_writer.submit(request_row_id, row_tenant_id, "request", routed_payload.model_dump_json())
 
             try:
                 async for chunk in _stream_from(decision.provider, routed_payload, model_name):
@@ -566,7 +1255,7 @@ async def chat_stream(payload: ChatRequest, request: Request):
                         )
                         yield "data: [DONE]\n\n"
                         completed = True
-                        health_tracker.record(decision.provider, True)
+                        _record_health(decision.provider, True)
                     else:
                         yield chunk
                 if not done_sent:
@@ -589,25 +1278,56 @@ async def chat_stream(payload: ChatRequest, request: Request):
                     )
                     yield "data: [DONE]\n\n"
                     completed = True
-                    health_tracker.record(decision.provider, True)
+                    _record_health(decision.provider, True)
             except asyncio.CancelledError:
                 raise
-            except Exception:
-                health_tracker.record(decision.provider, False)
+            except Exception as exc:
+                _record_health(decision.provider, False)
                 fallback_provider = decision.fallback_provider
-                if fallback_provider and not content_parts:
+                stream_exc = exc
+                if (
+                    fallback_provider
+                    and not content_parts
+                    and not isinstance(exc, DeadlineExceeded)
+                    and _can_retry(deadline)
+                ):
+                    stream_exc = None
                     FALLBACK_TOTAL.labels("primary_error", decision.provider, fallback_provider).inc()
                     used_provider = fallback_provider
-                    async for chunk in _stream_from(fallback_provider, routed_payload, model_name):
-                        if isinstance(chunk, StreamChunk):
-                            if chunk.model:
-                                model_name = chunk.model
-                            prompt_tokens = int(chunk.prompt_tokens or 0)
-                            completion_tokens = int(chunk.completion_tokens or 0)
-                            total_tokens = prompt_tokens + completion_tokens
-                            if total_tokens == 0:
-                                total_tokens = _estimate_tokens(routed_payload.messages, "".join(content_parts))
-                                completion_tokens = total_tokens
+                    try:
+                        async for chunk in _stream_from(fallback_provider, routed_payload, model_name):
+                            if isinstance(chunk, StreamChunk):
+                                if chunk.model:
+                                    model_name = chunk.model
+                                prompt_tokens = int(chunk.prompt_tokens or 0)
+                                completion_tokens = int(chunk.completion_tokens or 0)
+                                total_tokens = prompt_tokens + completion_tokens
+                                if total_tokens == 0:
+                                    total_tokens = _estimate_tokens(routed_payload.messages, "".join(content_parts))
+                                    completion_tokens = total_tokens
+                                yield _format_sse(
+                                    {
+                                        "id": response_id,
+                                        "model": model_name,
+                                        "created": created,
+                                        "content": "",
+                                        "done": True,
+                                        "usage": {
+                                            "prompt_tokens": prompt_tokens,
+                                            "completion_tokens": completion_tokens,
+                                            "total_tokens": total_tokens,
+                                        },
+                                        "provider": used_provider,
+                                    }
+                                )
+                                yield "data: [DONE]\n\n"
+                                completed = True
+                                _record_health(fallback_provider, True)
+                            else:
+                                yield chunk
+                        if not done_sent:
+                            total_tokens = _estimate_tokens(routed_payload.messages, "".join(content_parts))
+                            completion_tokens = total_tokens
                             yield _format_sse(
                                 {
                                     "id": response_id,
@@ -625,66 +1345,69 @@ async def chat_stream(payload: ChatRequest, request: Request):
                             )
                             yield "data: [DONE]\n\n"
                             completed = True
-                            health_tracker.record(fallback_provider, True)
-                        else:
-                            yield chunk
-                    if not done_sent:
-                        total_tokens = _estimate_tokens(routed_payload.messages, "".join(content_parts))
-                        completion_tokens = total_tokens
-                        yield _format_sse(
-                            {
-                                "id": response_id,
-                                "model": model_name,
-                                "created": created,
-                                "content": "",
-                                "done": True,
-                                "usage": {
-                                    "prompt_tokens": prompt_tokens,
-                                    "completion_tokens": completion_tokens,
-                                    "total_tokens": total_tokens,
-                                },
-                                "provider": used_provider,
-                            }
-                        )
-                        yield "data: [DONE]\n\n"
-                        completed = True
-                        health_tracker.record(fallback_provider, True)
-                else:
+                            _record_health(fallback_provider, True)
+                    except asyncio.CancelledError:
+                        raise
+                    except Exception as fallback_exc:
+                        _record_health(fallback_provider, False)
+                        stream_exc = fallback_exc
+                if stream_exc is not None:
                     failed = True
-                    yield _format_sse(
-                        {
-                            "error": {
-                                "code": "stream_error",
-                                "message": "Stream failed",
-                            }
-                        }
-                    )
+                    if isinstance(stream_exc, (DeadlineExceeded, StreamIdleTimeout)):
+                        timed_out = True
+                        reason = "deadline" if isinstance(stream_exc, DeadlineExceeded) else "idle"
+                        DEADLINE_EXCEEDED_TOTAL.labels("chat_stream", reason).inc()
+                    yield _format_sse({"error": _stream_error(stream_exc)})
                     yield "data: [DONE]\n\n"
         except asyncio.CancelledError:
             canceled = True
         finally:
+            await watcher.stop()
+            if canceled and watcher.disconnected:
+                STREAM_DISCONNECTS_TOTAL.labels(used_provider or "unknown").inc()
             if req_row is not None:
                 elapsed_ms = int((time.perf_counter() - start) * 1000)
                 req_row.latency_ms = elapsed_ms
                 if completed:
                     req_row.status = "completed"
-                    req_row.response_payload = ChatResponse(
-                        id=response_id,
-                        model=(model_name or req_row.model),
-                        created=created,
-                        content="".join(content_parts),
-                    ).model_dump_json()
+                    _record_stream_quality(
+                        req_row,
+                        model_name or req_row.model,
+                        used_provider or "unknown",
+                        start,
+                        first_token_at,
+                        last_token_at,
+                        token_gap_total,
+                        token_gap_count,
+                        completion_tokens,
+                    )
+                    payload_writer.submit(
+                        request_row_id,
+                        req_row.tenant_id,
+                        "response",
+                        ChatResponse(
+                            id=response_id,
+                            model=(model_name or req_row.model),
+                            created=created,
+                            content="".join(content_parts),
+                        ).model_dump_json(),
+                    )
                     req_row.prompt_tokens = prompt_tokens
                     req_row.completion_tokens = completion_tokens
                     req_row.total_tokens = total_tokens
                     pricing_map = _get_pricing_map()
-                    req_row.cost_usd = cost_usd(
-                        req_row.model,
-                        prompt_tokens,
-                        completion_tokens,
-                        0,
-                        pricing_map=pricing_map,
-                    )
+                    if shared_from is not None:
+                        # Joined an in-flight generation: bill the output at the cached rate.
+                        req_row.shared_request_id = shared_from
+                        req_row.cost_usd = cost_usd(req_row.model, 0, 0, total_tokens, pricing_map=pricing_map)
+                    else:
+                        req_row.cost_usd = cost_usd(
+                            req_row.model,
+                            prompt_tokens,
+                            completion_tokens,
+                            0,
+                            pricing_map=pricing_map,
+                        )
                     req_row.completed_at = func.now()
                     db.add(req_row)
                     usage = UsageEvent(
@@ -701,25 +1424,66 @@ async def chat_stream(payload: ChatRequest, request: Request):
                     COST_TOTAL.labels(req_row.model).inc(req_row.cost_usd or 0.0)
                     tenant = db.query(Tenant).filter(Tenant.id == req_row.tenant_id).one_or_none()
                     if tenant is not None:
-                        TENANT_REQUESTS_TOTAL.labels(tenant.name, tenant.tier).inc()
-                        TENANT_TOKENS_TOTAL.labels(tenant.name, tenant.tier).inc(req_row.total_tokens or 0)
-                        TENANT_COST_TOTAL.labels(tenant.name, tenant.tier).inc(req_row.cost_usd or 0.0)
-                elif canceled:
-                    req_row.status = "canceled"
+                        TENANT_REQUESTS_TOTAL.labels(tenant_label(tenant.name), tenant.tier).inc()
+                        TENANT_TOKENS_TOTAL.labels(tenant_label(tenant.name), tenant.tier).inc(req_row.total_tokens or 0)
+                        TENANT_COST_TOTAL.labels(tenant_label(tenant.name), tenant.tier).inc(req_row.cost_usd or 0.0)
+                    rolling_metrics.record(
+                        tenant.name if tenant is not None else "unknown",
+                        req_row.model,
+                        used_provider or "unknown",
+                        elapsed_ms,
+                        True,
+                        tokens=req_row.total_tokens or 0,
+                        cost=req_row.cost_usd or 0.0,
+                    )
+                elif failed:
+                    rolling_metrics.record(
+                        tenant.name if tenant is not None else "unknown",
+                        model_name or req_row.model,
+                        used_provider or "unknown",
+                        elapsed_ms,
+                        False,
+                    )
+                    req_row.status = "timeout" if timed_out else "failed"
                     req_row.completed_at = func.now()
                     db.add(req_row)
                     db.commit()
-                elif failed:
-                    req_row.status = "failed"
+                else:
+                    req_row.status = "canceled"
                     req_row.completed_at = func.now()
                     db.add(req_row)
                     db.commit()
             db.close()
 
-    stream = StreamingResponse(_event_generator(), media_type="text/event-stream")
+    async def _counted_frames():
+        frames = 0
+        sent_bytes = 0
+        events = _event_generator()
+        try:
+            async for frame in events:
+                frames += 1
+                frame = f"id: {response_id}:{frames}\n{frame}"
+                sent_bytes += len(frame)
+                yield frame
+        finally:
+            await events.aclose()
+            SSE_FRAMES_PER_STREAM.labels(stream_mode).observe(frames)
+            SSE_BYTES_PER_STREAM.labels(stream_mode).observe(sent_bytes)
+
+    if resumable:
+        buffer = replay_store.create(response_id, str(getattr(request.state, "tenant_id", None)))
+        buffer.start(_counted_frames())
+        body = _follow_replay(buffer, 0)
+    else:
+        body = _counted_frames()
+
+    stream = StreamingResponse(body, media_type="text/event-stream")
     stream.headers["Cache-Control"] = "no-cache"
     stream.headers["X-Accel-Buffering"] = "no"
     stream.headers["X-Cache"] = "bypass"
+    stream.headers["X-Stream-Mode"] = stream_mode
+    if resumable:
+        stream.headers["X-Stream-Id"] = response_id
     return stream
 
 
@@ -752,28 +1516,21 @@ async def create_key(payload: CreateKeyRequest, request: Request):
         db.commit()
     finally:
         db.close()
+    key_counts_cache.invalidate("api_keys")
 
     return CreateKeyResponse(tenant=requested_name, api_key=raw_key)
 
 
 @app.post("/v1/ui/keys/telemetry")
 async def ui_keys_telemetry(payload: UiKeysTelemetryRequest, request: Request):
-    db = get_session()
-    try:
-        total_keys = db.query(ApiKey).count()
-        active_keys = db.query(ApiKey).filter(ApiKey.active.is_(True)).count()
-    finally:
-        db.close()
+    total_keys, active_keys = await _cached_api_key_counts()
     logger.info(
-        json.dumps(
-            {
-                "message": "ui_keys_telemetry",
-                "displayed_count": payload.displayed_count,
-                "sql_total": int(total_keys),
-                "sql_active": int(active_keys),
-            },
-            separators=(",", ":"),
-        )
+        {
+            "message": "ui_keys_telemetry",
+            "displayed_count": payload.displayed_count,
+            "sql_total": total_keys,
+            "sql_active": active_keys,
+        }
     )
     return {"status": "ok"}
 
@@ -816,37 +1573,68 @@ async def bootstrap_admin():
         db.commit()
     finally:
         db.close()
+    key_counts_cache.invalidate("api_keys")
 
     return {"api_key": raw_key}
 
 @app.get("/v1/admin/keys", response_model=ApiKeyListResponse)
-async def list_keys(request: Request):
+async def list_keys(
+    request: Request,
+    limit: int = 100,
+    cursor: str | None = None,
+    tenant: str | None = None,
+    active: bool | None = None,
+    name_prefix: str | None = None,
+):
     admin_id = _get_admin_tenant_id()
     if admin_id is None or str(request.state.tenant_id) != str(admin_id):
         return JSONResponse(status_code=403, content={"error": {"code": "forbidden", "message": "Admin only"}})
+    if not 1 <= limit <= MAX_KEYS_PAGE_SIZE:
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": "invalid_request", "message": f"limit must be between 1 and {MAX_KEYS_PAGE_SIZE}"}},
+        )
+    after = None
+    if cursor:
+        try:
+            after = _decode_key_cursor(cursor)
+        except ValueError:
+            return JSONResponse(
+                status_code=400,
+                content={"error": {"code": "invalid_request", "message": "Invalid cursor"}},
+            )
 
     db = get_session()
     try:
-        rows = (
-            db.query(ApiKey, Tenant)
-            .join(Tenant, Tenant.id == ApiKey.tenant_id)
-            .order_by(ApiKey.created_at.desc())
-            .all()
-        )
+        query = db.query(ApiKey, Tenant).join(Tenant, Tenant.id == ApiKey.tenant_id)
+        if tenant is not None:
+            query = query.filter(Tenant.name == tenant)
+        if active is not None:
+            query = query.filter(ApiKey.active.is_(active))
+        if name_prefix:
+            query = query.filter(ApiKey.name.startswith(name_prefix, autoescape=True))
+        if after is not None:
+            query = query.filter(tuple_(ApiKey.created_at, ApiKey.id) < tuple_(*after))
+        rows = query.order_by(ApiKey.created_at.desc(), ApiKey.id.desc()).limit(limit + 1).all()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            last_key = rows[-1][0]
+            next_cursor = _encode_key_cursor(last_key.created_at, last_key.id)
         keys = [
             {
                 "id": str(key.id),
                 "name": key.name,
-                "tenant": tenant.name,
+                "tenant": key_tenant.name,
                 "active": bool(key.active),
                 "created_at": key.created_at.isoformat(),
             }
-            for key, tenant in rows
+            for key, key_tenant in rows
         ]
     finally:
         db.close()
 
-    return ApiKeyListResponse(keys=keys)
+    return ApiKeyListResponse(keys=keys, next_cursor=next_cursor)
 
 
 @app.delete("/v1/admin/keys/{key_id}")
@@ -875,6 +1663,7 @@ async def delete_key(key_id: str, request: Request):
         db.commit()
     finally:
         db.close()
+    key_counts_cache.invalidate("api_keys")
 
     return {"status": "ok"}
 
@@ -887,6 +1676,7 @@ async def rotate_admin():
             content={"error": {"code": "forbidden", "message": "Admin reset disabled"}},
         )
     raw_key = _rotate_admin_key()
+    key_counts_cache.invalidate("api_keys")
     return {"api_key": raw_key}
 
 
@@ -919,6 +1709,67 @@ async def set_limits(payload: LimitsRequest, request: Request):
     )
 
 
+@app.post("/v1/admin/retention", response_model=RetentionResponse)
+async def set_retention(payload: RetentionRequest, request: Request):
+    admin_id = _get_admin_tenant_id()
+    if admin_id is None or str(request.state.tenant_id) != str(admin_id):
+        return JSONResponse(status_code=403, content={"error": {"code": "forbidden", "message": "Admin only"}})
+
+    db = get_session()
+    try:
+        tenant = db.query(Tenant).filter(Tenant.name == payload.tenant).one_or_none()
+        if tenant is None:
+            return JSONResponse(
+                status_code=404,
+                content={"error": {"code": "not_found", "message": "Tenant not found"}},
+            )
+
+        tenant.retention_days = payload.retention_days
+        db.add(tenant)
+        db.commit()
+    finally:
+        db.close()
+
+    return RetentionResponse(tenant=payload.tenant, retention_days=payload.retention_days)
+
+
+@app.get("/v1/admin/requests/{request_id}/payload")
+async def get_request_payload(request_id: str, request: Request):
+    admin_id = _get_admin_tenant_id()
+    if admin_id is None or str(request.state.tenant_id) != str(admin_id):
+        return JSONResponse(status_code=403, content={"error": {"code": "forbidden", "message": "Admin only"}})
+    try:
+        row_id = uuid.UUID(request_id)
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": "invalid_request", "message": "request_id must be a UUID"}},
+        )
+
+    db = get_session()
+    try:
+        req_row = db.query(RequestModel).filter(RequestModel.id == row_id).one_or_none()
+        if req_row is None:
+            return JSONResponse(
+                status_code=404,
+                content={"error": {"code": "not_found", "message": "Request not found"}},
+            )
+        payloads = read_payloads(db, row_id)
+        # Rows written before payload capture moved to request_payloads.
+        for kind, legacy in (("request", req_row.request_payload), ("response", req_row.response_payload)):
+            if kind not in payloads and legacy is not None:
+                payloads[kind] = {
+                    "content": legacy,
+                    "codec": "none",
+                    "size_bytes": len(legacy.encode("utf-8")),
+                    "stored_bytes": len(legacy.encode("utf-8")),
+                    "truncated": False,
+                }
+        return {"request_id": str(row_id), "status": req_row.status, "payloads": payloads}
+    finally:
+        db.close()
+
+
 @app.post("/v1/admin/health/reset")
 async def reset_health(request: Request):
     admin_id = _get_admin_tenant_id()
@@ -928,6 +1779,44 @@ async def reset_health(request: Request):
     return {"status": "ok"}
 
 
+@app.get("/v1/admin/loop")
+async def event_loop_report(request: Request):
+    admin_id = _get_admin_tenant_id()
+    if admin_id is None or str(request.state.tenant_id) != str(admin_id):
+        return JSONResponse(status_code=403, content={"error": {"code": "forbidden", "message": "Admin only"}})
+    return {"worker": WORKER_ID, "enabled": LOOP_MONITOR_ENABLED, **loop_monitor.report()}
+
+
+@app.post("/v1/admin/profile")
+async def profile(
+    request: Request,
+    seconds: float = 5.0,
+    interval_ms: float = 5.0,
+    threads: str = "loop",
+    allocations: bool = False,
+    format: str = "json",
+):
+    admin_id = _get_admin_tenant_id()
+    if admin_id is None or str(request.state.tenant_id) != str(admin_id):
+        return JSONResponse(status_code=403, content={"error": {"code": "forbidden", "message": "Admin only"}})
+    if threads not in ("loop", "all") or format not in ("json", "collapsed"):
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": "invalid_request", "message": "threads must be loop|all, format json|collapsed"}},
+        )
+
+    thread_ids = {threading.get_ident()} if threads == "loop" else None
+    try:
+        result = await asyncio.to_thread(
+            profiler.run, thread_ids, seconds, interval_ms / 1000, allocations
+        )
+    except ProfilerBusy as exc:
+        return JSONResponse(status_code=409, content={"error": {"code": "profiler_busy", "message": str(exc)}})
+    if format == "collapsed":
+        return Response(content=result["collapsed"] + "\n", media_type="text/plain")
+    return {"worker": WORKER_ID, **result}
+
+
 @app.get("/v1/admin/usage/{tenant_name}", response_model=UsageSummaryResponse)
 async def usage_summary(tenant_name: str, request: Request):
     admin_id = _get_admin_tenant_id()
@@ -968,55 +1857,151 @@ async def usage_summary(tenant_name: str, request: Request):
     )
 
 
-async def _prom_query(query: str) -> float:
-    async with httpx.AsyncClient(timeout=5.0) as client:
-        resp = await client.get(f"{PROMETHEUS_URL}/api/v1/query", params={"query": query})
-        resp.raise_for_status()
-        payload = resp.json()
-    result = payload.get("data", {}).get("result", [])
-    if not result:
-        return 0.0
-    value = result[0].get("value")
-    if not value or len(value) < 2:
-        return 0.0
+@app.get("/v1/admin/usage/{tenant_name}/export")
+async def export_usage(
+    tenant_name: str,
+    request: Request,
+    kind: str = "requests",
+    format: str = "ndjson",
+    start: str | None = None,
+    end: str | None = None,
+):
+    admin_id = _get_admin_tenant_id()
+    if admin_id is None or str(request.state.tenant_id) != str(admin_id):
+        return JSONResponse(status_code=403, content={"error": {"code": "forbidden", "message": "Admin only"}})
+    if kind not in ("requests", "usage_events") or format not in ("ndjson", "csv"):
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": "invalid_request", "message": "kind must be requests|usage_events, format ndjson|csv"}},
+        )
     try:
-        return float(value[1])
-    except (TypeError, ValueError):
-        return 0.0
+        start_at = datetime.fromisoformat(start) if start else None
+        end_at = datetime.fromisoformat(end) if end else None
+    except ValueError:
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": "invalid_request", "message": "start and end must be ISO 8601 timestamps"}},
+        )
 
+    db = get_session()
+    try:
+        tenant = db.query(Tenant).filter(Tenant.name == tenant_name).one_or_none()
+    finally:
+        db.close()
+    if tenant is None:
+        return JSONResponse(
+            status_code=404,
+            content={"error": {"code": "not_found", "message": "Tenant not found"}},
+        )
 
-@app.get("/v1/observability/summary", response_model=ObservabilitySummaryResponse)
-async def observability_summary(request: Request):
-    request_rate = await _prom_query('sum(rate(http_requests_total[5m]))')
-    error_rate = await _prom_query(
-        'sum(rate(http_requests_total{status_code=~"4..|5.."}[5m]))'
-    )
-    total_rate = await _prom_query('sum(rate(http_requests_total[5m]))')
-    error_ratio = (error_rate / total_rate) if total_rate > 0 else 0.0
-    p95_latency = await _prom_query(
-        "histogram_quantile(0.95, sum(rate(http_request_duration_seconds_bucket[5m])) by (le))"
+    body = encode_rows(kind, export_rows(kind, tenant.id, start_at, end_at, EXPORT_PAGE_SIZE), format)
+    media_type = "text/csv" if format == "csv" else "application/x-ndjson"
+    extension = "csv" if format == "csv" else "ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{tenant_name}-{kind}.{extension}"'},
     )
-    cache_hits = await _prom_query('sum(rate(cache_hits_total[5m]))')
-    cache_misses = await _prom_query('sum(rate(cache_misses_total[5m]))')
-    rate_limited = await _prom_query('sum(rate(rate_limited_total[5m]))')
-    tokens_total = await _prom_query('sum(tokens_total)')
-    cost_total = await _prom_query('sum(cost_total)')
-    cache_total = cache_hits + cache_misses
+
+
+def _summary_queries(tenant: str | None) -> dict[str, str]:
+    if tenant is None:
+        return {
+            "request_rate": "sum(rate(http_requests_total[5m]))",
+            "error_rate": 'sum(rate(http_requests_total{status_code=~"4..|5.."}[5m]))',
+            "p95_latency": "histogram_quantile(0.95, sum(rate(http_request_duration_seconds_bucket[5m])) by (le))",
+            "cache_hits": "sum(rate(cache_hits_total[5m]))",
+            "cache_misses": "sum(rate(cache_misses_total[5m]))",
+            "rate_limited": "sum(rate(rate_limited_total[5m]))",
+            "tokens_total": "sum(tokens_total)",
+            "cost_total": "sum(cost_total)",
+        }
+    selector = f'{{tenant="{label_value(tenant)}"}}'
+    # HTTP, latency and rate-limit series carry no tenant label, so they are omitted here.
+    return {
+        "request_rate": f"sum(rate(tenant_requests_total{selector}[5m]))",
+        "cache_hits": f"sum(rate(cache_hits_total{selector}[5m]))",
+        "cache_misses": f"sum(rate(cache_misses_total{selector}[5m]))",
+        "tokens_total": f"sum(tenant_tokens_total{selector})",
+        "cost_total": f"sum(tenant_cost_total{selector})",
+    }
+
+
+async def _build_summary(tenant: str | None) -> ObservabilitySummaryResponse:
+    queries = _summary_queries(tenant)
+    results = await prom_client.query_many(queries.values())
+    values = {name: results[query] for name, query in queries.items()}
+    request_rate = values["request_rate"]
+    # Tenant scope has no error, latency or rate-limit series: report no data, not zero.
+    error_rate = values.get("error_rate")
+    error_ratio = None if error_rate is None else (error_rate / request_rate) if request_rate > 0 else 0.0
+    p95_latency = values.get("p95_latency")
+    cache_hits = values["cache_hits"]
+    cache_total = cache_hits + values["cache_misses"]
     cache_hit_rate = (cache_hits / cache_total) if cache_total > 0 else 0.0
 
     return ObservabilitySummaryResponse(
         request_rate_per_s=request_rate,
         error_rate=error_ratio,
-        p95_latency_ms=p95_latency * 1000,
+        p95_latency_ms=p95_latency * 1000 if p95_latency is not None else None,
         cache_hit_rate=cache_hit_rate,
-        rate_limited_per_s=rate_limited,
-        tokens_total=tokens_total,
-        cost_total=cost_total,
-        scope="global",
-        tenant=None,
+        rate_limited_per_s=values.get("rate_limited"),
+        tokens_total=values["tokens_total"],
+        cost_total=values["cost_total"],
+        scope="tenant" if tenant is not None else "global",
+        tenant=tenant,
+        source="prometheus",
     )
 
 
+@app.get("/v1/observability/summary", response_model=ObservabilitySummaryResponse)
+async def observability_summary(
+    request: Request,
+    tenant: str | None = None,
+    window: str = "5m",
+    source: str = "local",
+):
+    if window not in WINDOWS or source not in ("local", "prometheus"):
+        return JSONResponse(
+            status_code=400,
+            content={"error": {"code": "invalid_request", "message": "Invalid window or source"}},
+        )
+    if tenant is not None:
+        caller_id = getattr(request.state, "tenant_id", None)
+        admin_id = _get_admin_tenant_id()
+        if admin_id is None or str(caller_id) != str(admin_id):
+            db = get_session()
+            try:
+                caller = db.query(Tenant).filter(Tenant.id == caller_id).one_or_none()
+            finally:
+                db.close()
+            if caller is None or caller.name != tenant:
+                return JSONResponse(
+                    status_code=403,
+                    content={"error": {"code": "forbidden", "message": "Tenant scope not allowed"}},
+                )
+    cache_key = "global" if tenant is None else f"tenant:{tenant}"
+    if source == "local":
+        stats = rolling_metrics.summary(cache_key, window)
+        return ObservabilitySummaryResponse(
+            request_rate_per_s=stats["request_rate_per_s"],
+            error_rate=stats["error_rate"],
+            p50_latency_ms=stats["p50_latency_ms"],
+            p95_latency_ms=stats["p95_latency_ms"],
+            p99_latency_ms=stats["p99_latency_ms"],
+            cache_hit_rate=stats["cache_hit_rate"],
+            rate_limited_per_s=stats["rate_limited_per_s"],
+            tokens_total=stats["tokens_total"],
+            tokens_per_s=stats["tokens_per_s"],
+            cost_total=stats["cost_total"],
+            scope="tenant" if tenant is not None else "global",
+            tenant=tenant,
+            window=window,
+            source="local",
+        )
+    return await summary_cache.get(cache_key, lambda: _build_summary(tenant))
+
+
 @app.get("/v1/admin/pricing", response_model=PricingResponse)
 async def get_pricing(request: Request):
     admin_id = _get_admin_tenant_id()
@@ -1049,42 +2034,62 @@ async def set_pricing(payload: PricingResponse, request: Request):
 
     db = get_session()
     try:
-        for item in payload.items:
-            existing = db.query(Pricing).filter(Pricing.model == item.model).one_or_none()
-            if existing is None:
-                db.add(
-                    Pricing(
-                        model=item.model,
-                        input_per_1k=item.input_per_1k,
-                        output_per_1k=item.output_per_1k,
-                        cached_per_1k=item.cached_per_1k,
-                    )
-                )
-            else:
-                existing.input_per_1k = item.input_per_1k
-                existing.output_per_1k = item.output_per_1k
-                existing.cached_per_1k = item.cached_per_1k
-                db.add(existing)
-        db.commit()
+        if payload.items:
+            stmt = pg_insert(Pricing).values(
+                [
+                    {
+                        "id": uuid.uuid4(),
+                        "model": item.model,
+                        "input_per_1k": item.input_per_1k,
+                        "output_per_1k": item.output_per_1k,
+                        "cached_per_1k": item.cached_per_1k,
+                    }
+                    for item in {item.model: item for item in payload.items}.values()
+                ]
+            )
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[Pricing.model],
+                set_={
+                    "input_per_1k": stmt.excluded.input_per_1k,
+                    "output_per_1k": stmt.excluded.output_per_1k,
+                    "cached_per_1k": stmt.excluded.cached_per_1k,
+                    "updated_at": func.now(),
+                },
+            )
+            db.execute(stmt)
+            db.commit()
+        items = _pricing_items(db)
     finally:
         db.close()
 
+    version = pricing_table.version + 1
+    if redis_client is not None:
+        version = max(version, int(await redis_client.incr(PRICING_VERSION_KEY)))
+    pricing_table.load(items, version)
+    if redis_client is not None:
+        await redis_client.publish(
+            PRICING_CHANNEL,
+            json.dumps({"version": version, "items": items}, separators=(",", ":")),
+        )
+
     return payload
 
-@app.middleware("http")
-async def api_key_auth(request: Request, call_next):
-    if request.method == "OPTIONS":
-        return await call_next(request)
-    if request.url.path in {
-        "/health",
-        "/metrics",
-        "/health/ollama",
-        "/v1/admin/bootstrap",
-        "/v1/admin/rotate",
-        "/v1/admin/status",
-    }:
-        return await call_next(request)
+PUBLIC_PATHS = frozenset({"/health", "/metrics", "/health/ollama"})
+AUTH_EXEMPT_ADMIN_PATHS = frozenset({"/v1/admin/bootstrap", "/v1/admin/rotate", "/v1/admin/status"})
+
 
+def _classify_route(method: str, path: str) -> str:
+    if method == "OPTIONS" or path in PUBLIC_PATHS:
+        return "public"
+    if path in AUTH_EXEMPT_ADMIN_PATHS:
+        return "admin_open"
+    if path.startswith("/v1/admin"):
+        return "admin"
+    return "api"
+
+
+async def _authenticate(ctx: RequestContext) -> Response | None:
+    request = ctx.request
     raw_key = None
     auth_header = request.headers.get("Authorization")
     if auth_header and auth_header.lower().startswith("bearer "):
@@ -1095,161 +2100,165 @@ async def api_key_auth(request: Request, call_next):
     if not raw_key:
         return JSONResponse(status_code=401, content={"error": {"code": "unauthorized", "message": "Missing API key"}})
 
-    key_hash = hash_api_key(raw_key)
-    db = get_session()
-    try:
-        api_key = db.query(ApiKey).filter(ApiKey.key_hash == key_hash, ApiKey.active.is_(True)).one_or_none()
-    finally:
-        db.close()
+    with ctx.timer.stage("auth"):
+        key_hash = hash_api_key(raw_key)
+        db = get_session()
+        try:
+            api_key = db.query(ApiKey).filter(ApiKey.key_hash == key_hash, ApiKey.active.is_(True)).one_or_none()
+        finally:
+            db.close()
 
     if api_key is None:
         return JSONResponse(status_code=401, content={"error": {"code": "unauthorized", "message": "Invalid API key"}})
 
     request.state.tenant_id = api_key.tenant_id
-    return await call_next(request)
+    return None
 
 
-@app.middleware("http")
-async def rate_limit_requests(request: Request, call_next):
-    if request.method == "OPTIONS":
-        return await call_next(request)
-    if request.url.path in {"/health", "/metrics", "/health/ollama"} or request.url.path.startswith("/v1/admin"):
-        return await call_next(request)
-
+async def _enforce_rate_limit(ctx: RequestContext) -> Response | None:
     if redis_client is None:
         return JSONResponse(
             status_code=503,
             content={"error": {"code": "rate_limit_unavailable", "message": "Redis unavailable"}},
         )
 
-    tenant_id = getattr(request.state, "tenant_id", "unknown")
-    minute_bucket = int(time.time() // 60)
-    key = f"rl:req:{tenant_id}:{minute_bucket}"
+    with ctx.timer.stage("rate_limit"):
+        tenant_id = getattr(ctx.request.state, "tenant_id", "unknown")
+        minute_bucket = int(time.time() // 60)
+        key = f"rl:req:{tenant_id}:{minute_bucket}"
 
-    count = await redis_client.incr(key)
-    if count == 1:
-        await redis_client.expire(key, 60)
+        count = await redis_client.incr(key)
+        if count == 1:
+            await redis_client.expire(key, 60)
 
-    if count > REQUESTS_PER_MINUTE:
-        retry_after = 60 - int(time.time() % 60)
-        RATE_LIMITED_TOTAL.labels("requests_per_minute").inc()
-        return JSONResponse(
-            status_code=429,
-            headers={"Retry-After": str(retry_after)},
-            content={"error": {"code": "rate_limited", "message": "Request limit exceeded"}},
-        )
+        if count > REQUESTS_PER_MINUTE:
+            retry_after = 60 - int(time.time() % 60)
+            RATE_LIMITED_TOTAL.labels("requests_per_minute").inc()
+            rolling_metrics.record_rate_limited()
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": str(retry_after)},
+                content={"error": {"code": "rate_limited", "message": "Request limit exceeded"}},
+            )
 
-    token_estimate = 2
-    token_key = f"rl:tokens:{tenant_id}:{minute_bucket}"
-    token_count = await redis_client.incrby(token_key, token_estimate)
-    if token_count == token_estimate:
-        await redis_client.expire(token_key, 60)
+        token_estimate = 2
+        token_key = f"rl:tokens:{tenant_id}:{minute_bucket}"
+        token_count = await redis_client.incrby(token_key, token_estimate)
+        if token_count == token_estimate:
+            await redis_client.expire(token_key, 60)
 
-    if token_count > TOKENS_PER_MINUTE:
-        retry_after = 60 - int(time.time() % 60)
-        RATE_LIMITED_TOTAL.labels("tokens_per_minute").inc()
-        return JSONResponse(
-            status_code=429,
-            headers={"Retry-After": str(retry_after)},
-            content={"error": {"code": "rate_limited", "message": "Token limit exceeded"}},
-        )
-
-    return await call_next(request)
+        if token_count > TOKENS_PER_MINUTE:
+            retry_after = 60 - int(time.time() % 60)
+            RATE_LIMITED_TOTAL.labels("tokens_per_minute").inc()
+            rolling_metrics.record_rate_limited()
+            return JSONResponse(
+                status_code=429,
+                headers={"Retry-After": str(retry_after)},
+                content={"error": {"code": "rate_limited", "message": "Token limit exceeded"}},
+            )
 
+        return None
 
-@app.middleware("http")
-async def quota_limits(request: Request, call_next):
-    if request.method == "OPTIONS":
-        return await call_next(request)
-    if request.url.path in {"/health", "/metrics", "/health/ollama"} or request.url.path.startswith("/v1/admin"):
-        return await call_next(request)
 
-    tenant_id = getattr(request.state, "tenant_id", None)
+async def _enforce_quota(ctx: RequestContext) -> Response | None:
+    tenant_id = getattr(ctx.request.state, "tenant_id", None)
     if tenant_id is None:
-        return await call_next(request)
+        return None
 
-    db = get_session()
-    try:
-        tenant = db.query(Tenant).filter(Tenant.id == tenant_id).one_or_none()
-        if tenant is None:
-            return await call_next(request)
+    with ctx.timer.stage("quota"):
+        db = get_session()
+        try:
+            tenant = db.query(Tenant).filter(Tenant.id == tenant_id).one_or_none()
+            if tenant is None:
+                return None
+            if tenant.token_limit_per_day is None and tenant.spend_limit_per_day_usd is None:
+                return None
+
+            totals = (
+                db.query(
+                    func.coalesce(func.sum(UsageEvent.tokens), 0),
+                    func.coalesce(func.sum(UsageEvent.cost_usd), 0.0),
+                )
+                .filter(UsageEvent.tenant_id == tenant.id)
+                .filter(UsageEvent.created_at >= func.current_date())
+                .one()
+            )
+        finally:
+            db.close()
 
-        if tenant.token_limit_per_day is None and tenant.spend_limit_per_day_usd is None:
-            return await call_next(request)
+    tokens_used = int(totals[0] or 0)
+    cost_used = float(totals[1] or 0.0)
 
-        today = func.date(func.now())
-        totals = (
-            db.query(
-                func.coalesce(func.sum(UsageEvent.tokens), 0),
-                func.coalesce(func.sum(UsageEvent.cost_usd), 0.0),
+    warn_headers = {}
+    if tenant.token_limit_per_day:
+        remaining_tokens = tenant.token_limit_per_day - tokens_used
+        warn_headers["X-RateLimit-Tokens-Remaining"] = str(max(remaining_tokens, 0))
+        if remaining_tokens <= 0:
+            QUOTA_DENIED_TOTAL.labels("token_limit").inc()
+            return JSONResponse(
+                status_code=429,
+                headers=warn_headers,
+                content={"error": {"code": "quota_exceeded", "message": "Daily token budget exceeded"}},
             )
-            .filter(UsageEvent.tenant_id == tenant.id)
-            .filter(func.date(UsageEvent.created_at) == today)
-            .one()
-        )
-        tokens_used = int(totals[0] or 0)
-        cost_used = float(totals[1] or 0.0)
-
-        warn_headers = {}
-        if tenant.token_limit_per_day:
-            remaining_tokens = tenant.token_limit_per_day - tokens_used
-            warn_headers["X-RateLimit-Tokens-Remaining"] = str(max(remaining_tokens, 0))
-            if remaining_tokens <= 0:
-                QUOTA_DENIED_TOTAL.labels("token_limit").inc()
-                return JSONResponse(
-                    status_code=429,
-                    headers=warn_headers,
-                    content={"error": {"code": "quota_exceeded", "message": "Daily token budget exceeded"}},
-                )
 
-        if tenant.spend_limit_per_day_usd:
-            remaining_spend = tenant.spend_limit_per_day_usd - cost_used
-            warn_headers["X-RateLimit-Spend-Remaining"] = f"{max(remaining_spend, 0):.6f}"
-            if remaining_spend <= 0:
-                QUOTA_DENIED_TOTAL.labels("spend_limit").inc()
-                return JSONResponse(
-                    status_code=429,
-                    headers=warn_headers,
-                    content={"error": {"code": "quota_exceeded", "message": "Daily spend budget exceeded"}},
-                )
+    if tenant.spend_limit_per_day_usd:
+        remaining_spend = tenant.spend_limit_per_day_usd - cost_used
+        warn_headers["X-RateLimit-Spend-Remaining"] = f"{max(remaining_spend, 0):.6f}"
+        if remaining_spend <= 0:
+            QUOTA_DENIED_TOTAL.labels("spend_limit").inc()
+            return JSONResponse(
+                status_code=429,
+                headers=warn_headers,
+                content={"error": {"code": "quota_exceeded", "message": "Daily spend budget exceeded"}},
+            )
 
-        response = await call_next(request)
-        for k, v in warn_headers.items():
-            response.headers[k] = v
-        return response
-    finally:
-        db.close()
+    ctx.response_headers.update(warn_headers)
+    return None
 
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    request_id = request.headers.get("X-Request-Id") or str(uuid.uuid4())
-    idempotency_key = request.headers.get("Idempotency-Key")
-    start = time.perf_counter()
-    response = None
-    try:
-        response = await call_next(request)
-    finally:
-        elapsed_seconds = time.perf_counter() - start
+def _on_response_start(ctx: RequestContext, headers) -> None:
+    headers["X-Request-Id"] = ctx.request_id
+    if SERVER_TIMING_ENABLED:
+        timing = ctx.timer.server_timing()
+        total = f"total;dur={ctx.elapsed_s * 1000:.2f}"
+        headers["Server-Timing"] = f"{timing}, {total}" if timing else total
+    if ctx.idempotency_key:
+        headers["Idempotency-Key"] = ctx.idempotency_key
+
+
+def _log_request(ctx: RequestContext) -> None:
+    request = ctx.request
+    path_label = route_label(request)
+    duration_ms = round(ctx.elapsed_s * 1000, 2)
+    if log_sampler.should_log(path_label, ctx.status_code, duration_ms):
         payload = {
             "message": "request",
-            "request_id": request_id,
+            "request_id": ctx.request_id,
             "method": request.method,
             "path": request.url.path,
-            "status_code": getattr(response, "status_code", None),
-            "duration_ms": round(elapsed_seconds * 1000, 2),
-            "idempotency_key": idempotency_key,
+            "status_code": ctx.status_code,
+            "duration_ms": duration_ms,
+            "idempotency_key": ctx.idempotency_key,
         }
-        logger.info(json.dumps(payload, separators=(",", ":")))
+        if ctx.timer.stages:
+            payload["stages"] = ctx.timer.as_ms()
+        logger.info(payload)
+    for stage, seconds in ctx.timer.stages.items():
+        STAGE_LATENCY.labels(stage).observe(seconds)
 
-    if response is None:
-        return JSONResponse(status_code=500, content={"error": {"code": "internal_error", "message": "Unhandled error"}})
+    status_code = str(ctx.status_code or 500)
+    REQUESTS_TOTAL.labels(request.method, path_label, status_code).inc()
+    REQUEST_LATENCY.labels(request.method, path_label).observe(ctx.elapsed_s)
 
-    response.headers["X-Request-Id"] = request_id
-    if idempotency_key:
-        response.headers["Idempotency-Key"] = idempotency_key
 
-    status_code = str(getattr(response, "status_code", 500))
-    REQUESTS_TOTAL.labels(request.method, request.url.path, status_code).inc()
-    REQUEST_LATENCY.labels(request.method, request.url.path).observe(elapsed_seconds)
-    return response
+app.add_middleware(
+    GatewayPipeline,
+    classify=_classify_route,
+    stages=[
+        (frozenset({"admin", "api"}), _authenticate),
+        (frozenset({"api"}), _enforce_rate_limit),
+        (frozenset({"api"}), _enforce_quota),
+    ],
+    on_response_start=_on_response_start,
+    on_complete=_log_request,
+)
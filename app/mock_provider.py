@@ -1,23 +1,77 @@
 import asyncio
+import random
 import time
 import uuid
+from dataclasses import dataclass
 
 from app.provider import Provider, ProviderResult, StreamChunk
 from app.schemas import ChatRequest, ChatResponse
 
+_WORDS = ("the", "gateway", "routes", "each", "request", "to", "a", "healthy", "model", "and", "streams", "tokens")
+
+
+@dataclass(frozen=True)
+class MockProfile:
+    base_ms: float = 200.0
+    prefill_ms_per_1k: float = 0.0
+    decode_tokens_per_s: float = 50.0
+    output_tokens: int = 64
+    jitter_sigma: float = 0.0
+    tail_rate: float = 0.0
+    tail_multiplier: float = 8.0
+    saturation: int = 0
+    saturation_slope: float = 0.5
+    burst_every: int = 0
+    burst_length: int = 0
+    timeout_rate: float = 0.0
+    timeout_s: float = 30.0
+    seed: int | None = None
+
 
 class MockProvider(Provider):
-    def __init__(self, delay_ms: int = 200, fail_rate: float = 0.0) -> None:
+    def __init__(
+        self,
+        delay_ms: int = 200,
+        fail_rate: float = 0.0,
+        batch_item_delay_ms: int = 10,
+        profile: MockProfile | None = None,
+    ) -> None:
         self.delay_ms = delay_ms
         self.fail_rate = fail_rate
+        self.batch_item_delay_ms = batch_item_delay_ms
+        self.profile = profile
+        self._rng = random.Random(profile.seed if profile is not None else None)
+        self._calls = 0
+        self._active = 0
 
     async def generate(self, request: ChatRequest) -> ProviderResult:
-        if self.fail_rate > 0:
-            import random
+        if self.profile is not None:
+            return await self._simulate_generate(request)
+        self._maybe_fail()
+        await asyncio.sleep(self.delay_ms / 1000)
+        return self._result(request)
+
+    async def generate_batch(self, requests: list[ChatRequest]) -> list[ProviderResult | BaseException]:
+        if self.profile is not None:
+            return await self._simulate_batch(requests)
+        # One shared forward pass plus a small marginal cost per extra sequence.
+        batch_delay_ms = self.delay_ms + self.batch_item_delay_ms * (len(requests) - 1)
+        await asyncio.sleep(batch_delay_ms / 1000)
+        results: list[ProviderResult | BaseException] = []
+        for request in requests:
+            try:
+                self._maybe_fail()
+                results.append(self._result(request))
+            except RuntimeError as exc:
+                results.append(exc)
+        return results
 
+    def _maybe_fail(self) -> None:
+        if self.fail_rate > 0:
             if random.random() < self.fail_rate:
                 raise RuntimeError("mock provider failure")
-        await asyncio.sleep(self.delay_ms / 1000)
+
+    def _result(self, request: ChatRequest) -> ProviderResult:
         content = "mock response"
         response = ChatResponse(
             id=str(uuid.uuid4()),
@@ -36,6 +90,10 @@ class MockProvider(Provider):
         )
 
     async def stream(self, request: ChatRequest):
+        if self.profile is not None:
+            async for chunk in self._simulate_stream(request):
+                yield chunk
+            return
         await asyncio.sleep(self.delay_ms / 1000)
         yield StreamChunk(content="mock ")
         await asyncio.sleep(self.delay_ms / 1000)
@@ -46,3 +104,103 @@ class MockProvider(Provider):
             prompt_tokens=1,
             completion_tokens=1,
         )
+
+    def _plan(self, request: ChatRequest) -> tuple[str, int, int, float, float]:
+        profile = self.profile
+        self._calls += 1
+        outcome = "ok"
+        if profile.burst_every > 0 and (self._calls - 1) % profile.burst_every < profile.burst_length:
+            outcome = "fail"
+        else:
+            roll = self._rng.random()
+            if roll < self.fail_rate:
+                outcome = "fail"
+            elif roll < self.fail_rate + profile.timeout_rate:
+                outcome = "timeout"
+
+        prompt_tokens = max(1, sum(len(message.content) for message in request.messages) // 4)
+        output_tokens = max(1, min(request.max_tokens or profile.output_tokens, profile.output_tokens))
+        slowdown = 1.0
+        if profile.saturation > 0 and self._active > profile.saturation:
+            slowdown += profile.saturation_slope * (self._active - profile.saturation) / profile.saturation
+        noise = self._rng.lognormvariate(0.0, profile.jitter_sigma) if profile.jitter_sigma > 0 else 1.0
+        if profile.tail_rate > 0 and self._rng.random() < profile.tail_rate:
+            noise *= profile.tail_multiplier
+        ttft_s = (profile.base_ms + profile.prefill_ms_per_1k * prompt_tokens / 1000) / 1000 * slowdown * noise
+        token_s = slowdown / profile.decode_tokens_per_s if profile.decode_tokens_per_s > 0 else 0.0
+        return outcome, prompt_tokens, output_tokens, ttft_s, token_s
+
+    async def _fail(self, outcome: str, delay_s: float) -> None:
+        if outcome == "timeout":
+            await asyncio.sleep(self.profile.timeout_s)
+            raise TimeoutError("mock provider timeout")
+        await asyncio.sleep(delay_s)
+        raise RuntimeError("mock provider failure")
+
+    def _simulated_result(self, request: ChatRequest, prompt_tokens: int, output_tokens: int) -> ProviderResult:
+        content = " ".join(_WORDS[i % len(_WORDS)] for i in range(output_tokens))
+        response = ChatResponse(
+            id=str(uuid.uuid4()),
+            model=request.model,
+            created=int(time.time()),
+            content=content,
+        )
+        return ProviderResult(
+            response=response,
+            prompt_tokens=prompt_tokens,
+            completion_tokens=output_tokens,
+            total_tokens=prompt_tokens + output_tokens,
+        )
+
+    async def _simulate_generate(self, request: ChatRequest) -> ProviderResult:
+        outcome, prompt_tokens, output_tokens, ttft_s, token_s = self._plan(request)
+        self._active += 1
+        try:
+            if outcome != "ok":
+                await self._fail(outcome, ttft_s)
+            await asyncio.sleep(ttft_s + token_s * output_tokens)
+            return self._simulated_result(request, prompt_tokens, output_tokens)
+        finally:
+            self._active -= 1
+
+    async def _simulate_batch(self, requests: list[ChatRequest]) -> list[ProviderResult | BaseException]:
+        plans = [self._plan(request) for request in requests]
+        self._active += len(requests)
+        try:
+            longest = max(ttft_s + token_s * output_tokens for _, _, output_tokens, ttft_s, token_s in plans)
+            await asyncio.sleep(longest + self.batch_item_delay_ms * (len(requests) - 1) / 1000)
+        finally:
+            self._active -= len(requests)
+        results: list[ProviderResult | BaseException] = []
+        for request, (outcome, prompt_tokens, output_tokens, _, _) in zip(requests, plans):
+            if outcome == "ok":
+                results.append(self._simulated_result(request, prompt_tokens, output_tokens))
+            elif outcome == "timeout":
+                results.append(TimeoutError("mock provider timeout"))
+            else:
+                results.append(RuntimeError("mock provider failure"))
+        return results
+
+    async def _simulate_stream(self, request: ChatRequest):
+        outcome, prompt_tokens, output_tokens, ttft_s, token_s = self._plan(request)
+        self._active += 1
+        try:
+            if outcome != "ok":
+                await self._fail(outcome, ttft_s)
+            await asyncio.sleep(ttft_s)
+            for i in range(output_tokens):
+                if i:
+                    await asyncio.sleep(token_s)
+                word = _WORDS[i % len(_WORDS)]
+                if i < output_tokens - 1:
+                    yield StreamChunk(content=word + " ")
+                else:
+                    yield StreamChunk(
+                        content=word,
+                        done=True,
+                        model=request.model,
+                        prompt_tokens=prompt_tokens,
+                        completion_tokens=output_tokens,
+                    )
+        finally:
+            self._active -= 1
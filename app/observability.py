@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from typing import Awaitable, Callable, Iterable
+
+import httpx
+
+
+class PrometheusClient:
+    def __init__(self, base_url: str, timeout_s: float = 5.0, max_connections: int = 10) -> None:
+        self.base_url = base_url.rstrip("/")
+        self.timeout_s = timeout_s
+        self.max_connections = max_connections
+        self._client: httpx.AsyncClient | None = None
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                timeout=self.timeout_s,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_connections,
+                ),
+            )
+        return self._client
+
+    async def close(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    async def query(self, query: str) -> float:
+        resp = await self._get_client().get("/api/v1/query", params={"query": query})
+        resp.raise_for_status()
+        payload = resp.json()
+        result = payload.get("data", {}).get("result", [])
+        if not result:
+            return 0.0
+        value = result[0].get("value")
+        if not value or len(value) < 2:
+            return 0.0
+        try:
+            return float(value[1])
+        except (TypeError, ValueError):
+            return 0.0
+
+    async def query_many(self, queries: Iterable[str]) -> dict[str, float]:
+        unique = list(dict.fromkeys(queries))
+        values = await asyncio.gather(*(self.query(query) for query in unique))
+        return dict(zip(unique, values))
+
+
+def label_value(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+class CoalescingCache:
+    def __init__(self, ttl_s: float, max_entries: int = 1024) -> None:
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._values: dict[str, tuple[float, object]] = {}
+        self._inflight: dict[str, asyncio.Task] = {}
+
+    async def get(self, key: str, factory: Callable[[], Awaitable[object]]):
+        entry = self._values.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(factory())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._store(key, done))
+        return await asyncio.shield(task)
+
+    def invalidate(self, key: str) -> None:
+        self._values.pop(key, None)
+
+    def _store(self, key: str, task: asyncio.Task) -> None:
+        self._inflight.pop(key, None)
+        if task.cancelled() or task.exception() is not None:
+            return
+        now = time.monotonic()
+        if len(self._values) >= self.max_entries:
+            for stale in [k for k, (expires_at, _) in self._values.items() if expires_at <= now]:
+                del self._values[stale]
+            if len(self._values) >= self.max_entries:
+                self._values.pop(next(iter(self._values)))
+        self._values[key] = (now + self.ttl_s, task.result())
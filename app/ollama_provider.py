@@ -6,6 +6,7 @@ import httpx
 
 from app.provider import Provider, ProviderResult, StreamChunk
 from app.schemas import ChatMessage, ChatRequest, ChatResponse
+from app.streaming import NDJSONSplitter
 
 
 class OllamaProvider(Provider):
@@ -64,31 +65,39 @@ class OllamaProvider(Provider):
         if request.max_tokens is not None:
             payload["options"]["num_predict"] = request.max_tokens
 
-        async with httpx.AsyncClient(timeout=None) as client:
+        # Reads stay unbounded; the gateway enforces idle-token and deadline limits.
+        async with httpx.AsyncClient(timeout=httpx.Timeout(self.timeout_s, read=None)) as client:
             async with client.stream("POST", f"{self.base_url}/api/chat", json=payload) as resp:
                 resp.raise_for_status()
-                async for line in resp.aiter_lines():
-                    if not line:
-                        continue
-                    data = json.loads(line)
-                    message = data.get("message") or {}
-                    content = message.get("content") or ""
-                    done = bool(data.get("done"))
-                    if done:
-                        prompt_tokens = int(data.get("prompt_eval_count") or 0)
-                        completion_tokens = int(data.get("eval_count") or 0)
-                        if prompt_tokens + completion_tokens == 0:
-                            completion_tokens = _estimate_tokens(request.messages, content)
-                        yield StreamChunk(
-                            content=content,
-                            done=True,
-                            model=data.get("model", request.model),
-                            prompt_tokens=prompt_tokens,
-                            completion_tokens=completion_tokens,
-                        )
-                    else:
-                        if content:
-                            yield StreamChunk(content=content)
+                splitter = NDJSONSplitter()
+                async for data in resp.aiter_bytes():
+                    for line in splitter.feed(data):
+                        chunk = _parse_stream_line(line, request)
+                        if chunk is not None:
+                            yield chunk
+                for line in splitter.flush():
+                    chunk = _parse_stream_line(line, request)
+                    if chunk is not None:
+                        yield chunk
+
+
+def _parse_stream_line(line: bytes, request: ChatRequest) -> StreamChunk | None:
+    data = json.loads(line.decode("utf-8"))
+    message = data.get("message")
+    content = (message.get("content") if message else None) or ""
+    if not data.get("done"):
+        return StreamChunk(content=content) if content else None
+    prompt_tokens = int(data.get("prompt_eval_count") or 0)
+    completion_tokens = int(data.get("eval_count") or 0)
+    if prompt_tokens + completion_tokens == 0:
+        completion_tokens = _estimate_tokens(request.messages, content)
+    return StreamChunk(
+        content=content,
+        done=True,
+        model=data.get("model", request.model),
+        prompt_tokens=prompt_tokens,
+        completion_tokens=completion_tokens,
+    )
 
 
 def _estimate_tokens(messages: list[ChatMessage], content: str) -> int:
@@ -0,0 +1,192 @@
+from __future__ import annotations
+
+import asyncio
+import uuid
+import zlib
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import insert
+
+from app.db.models import RequestPayload
+from app.db.session import get_session
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+CAPTURE_MODES = ("off", "sampled", "truncated", "full")
+
+
+def available_codecs() -> tuple[str, ...]:
+    return ("zstd", "zlib") if zstandard is not None else ("zlib",)
+
+
+def compress(data: bytes, codec: str, level: int) -> bytes:
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return zlib.compress(data, level)
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    if codec == "zlib":
+        return zlib.decompress(data)
+    return data
+
+
+class PayloadPolicy:
+    def __init__(
+        self,
+        mode: str = "full",
+        sample_rate: float = 1.0,
+        max_bytes: int = 4096,
+        codec: str = "zlib",
+        level: int = 6,
+    ) -> None:
+        if mode not in CAPTURE_MODES:
+            raise ValueError(f"unknown payload capture mode: {mode}")
+        if codec not in available_codecs():
+            raise ValueError(f"payload codec {codec} is not available; use one of {', '.join(available_codecs())}")
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.max_bytes = max_bytes
+        self.codec = codec
+        self.level = level
+
+    def captures(self, request_id: uuid.UUID) -> bool:
+        if self.mode == "off":
+            return False
+        if self.mode == "sampled":
+            # Keyed on the request id so the request and response halves agree.
+            return int.from_bytes(request_id.bytes[:8], "big") / 2**64 < self.sample_rate
+        return True
+
+    def encode(self, text: str) -> tuple[bytes, int, bool]:
+        raw = text.encode("utf-8")
+        size = len(raw)
+        truncated = self.mode == "truncated" and size > self.max_bytes
+        if truncated:
+            raw = raw[: self.max_bytes]
+        return compress(raw, self.codec, self.level), size, truncated
+
+
+class PayloadWriter:
+    def __init__(
+        self,
+        policy: PayloadPolicy,
+        max_queue: int = 10000,
+        batch_size: int = 200,
+        on_drop: Callable[[], None] | None = None,
+        on_write: Callable[[int, int], None] | None = None,
+    ) -> None:
+        self.policy = policy
+        self.batch_size = batch_size
+        self.on_drop = on_drop
+        self.on_write = on_write
+        self.dropped = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue)
+        self._task: asyncio.Task | None = None
+
+    def submit(self, request_id: uuid.UUID, tenant_id: uuid.UUID, kind: str, text: str | None) -> bool:
+        if text is None or not self.policy.captures(request_id):
+            return False
+        try:
+            self._queue.put_nowait((request_id, tenant_id, kind, text, datetime.now(timezone.utc)))
+        except asyncio.QueueFull:
+            self._count_dropped(1)
+            return False
+        return True
+
+    def start(self) -> None:
+        if self._task is None and self.policy.mode != "off":
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        while not self._queue.empty():
+            batch = self._drain([])
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except Exception:
+                self._count_dropped(len(batch) + self._queue.qsize())
+                break
+
+    def _drain(self, batch: list) -> list:
+        while len(batch) < self.batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = self._drain([await self._queue.get()])
+            try:
+                await asyncio.to_thread(self._write, batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self._count_dropped(len(batch))
+
+    def _count_dropped(self, count: int) -> None:
+        self.dropped += count
+        if self.on_drop is not None:
+            for _ in range(count):
+                self.on_drop()
+
+    def _write(self, batch: list) -> None:
+        rows = []
+        raw_bytes = 0
+        stored_bytes = 0
+        for request_id, tenant_id, kind, text, created_at in batch:
+            data, size, truncated = self.policy.encode(text)
+            raw_bytes += size
+            stored_bytes += len(data)
+            rows.append(
+                {
+                    "id": uuid.uuid4(),
+                    "request_id": request_id,
+                    "tenant_id": tenant_id,
+                    "kind": kind,
+                    "codec": self.policy.codec,
+                    "size_bytes": size,
+                    "truncated": truncated,
+                    "data": data,
+                    "created_at": created_at,
+                }
+            )
+        db = get_session()
+        try:
+            db.execute(insert(RequestPayload), rows)
+            db.commit()
+        finally:
+            db.close()
+        if self.on_write is not None:
+            self.on_write(raw_bytes, stored_bytes)
+
+
+def read_payloads(db, request_id: uuid.UUID) -> dict[str, dict]:
+    rows = db.query(RequestPayload).filter(RequestPayload.request_id == request_id).all()
+    payloads = {}
+    for row in rows:
+        payloads[row.kind] = {
+            "content": decompress(row.data, row.codec).decode("utf-8", errors="replace"),
+            "codec": row.codec,
+            "size_bytes": row.size_bytes,
+            "stored_bytes": len(row.data),
+            "truncated": row.truncated,
+        }
+    return payloads
@@ -0,0 +1,90 @@
+from __future__ import annotations
+
+import time
+import uuid
+from typing import Awaitable, Callable
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import Request
+from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from app.timing import StageTimer
+
+
+class RequestContext:
+    __slots__ = (
+        "request",
+        "route_kind",
+        "timer",
+        "request_id",
+        "idempotency_key",
+        "response_headers",
+        "status_code",
+        "start",
+        "elapsed_s",
+    )
+
+    def __init__(self, request: Request, route_kind: str) -> None:
+        self.request = request
+        self.route_kind = route_kind
+        self.timer = StageTimer()
+        self.request_id = request.headers.get("X-Request-Id") or str(uuid.uuid4())
+        self.idempotency_key = request.headers.get("Idempotency-Key")
+        self.response_headers: dict[str, str] = {}
+        self.status_code: int | None = None
+        self.start = time.perf_counter()
+        self.elapsed_s = 0.0
+
+
+Stage = Callable[[RequestContext], Awaitable[Response | None]]
+
+
+class GatewayPipeline:
+    def __init__(
+        self,
+        app: ASGIApp,
+        classify: Callable[[str, str], str],
+        stages: list[tuple[frozenset[str], Stage]],
+        on_response_start: Callable[[RequestContext, MutableHeaders], None],
+        on_complete: Callable[[RequestContext], None],
+    ) -> None:
+        self.app = app
+        self.classify = classify
+        self.stages = stages
+        self.on_response_start = on_response_start
+        self.on_complete = on_complete
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = Request(scope)
+        ctx = RequestContext(request, self.classify(scope["method"], scope["path"]))
+        request.state.timer = ctx.timer
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                ctx.elapsed_s = time.perf_counter() - ctx.start
+                ctx.status_code = message["status"]
+                headers = MutableHeaders(scope=message)
+                for name, value in ctx.response_headers.items():
+                    headers[name] = value
+                self.on_response_start(ctx, headers)
+            await send(message)
+
+        try:
+            for kinds, stage in self.stages:
+                if ctx.route_kind not in kinds:
+                    continue
+                response = await stage(ctx)
+                if response is not None:
+                    ctx.response_headers.clear()
+                    await response(scope, receive, send_wrapper)
+                    return
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            if ctx.status_code is None:
+                ctx.elapsed_s = time.perf_counter() - ctx.start
+            self.on_complete(ctx)
@@ -1,3 +1,6 @@
+from types import MappingProxyType
+from typing import Mapping
+
 PRICING_PER_1K = {
     "mock-1": {"input": 0.002, "output": 0.002, "cached": 0.0005},
     "tinyllama:latest": {"input": 0.0, "output": 0.0, "cached": 0.0},
@@ -31,3 +34,20 @@ def merge_pricing(items: list[dict]) -> dict:
             "cached": float(item.get("cached_per_1k", 0.0)),
         }
     return merged
+
+
+class PricingTable:
+    def __init__(self) -> None:
+        self.version = 0
+        self._snapshot: Mapping[str, dict] = MappingProxyType(dict(PRICING_PER_1K))
+
+    @property
+    def snapshot(self) -> Mapping[str, dict]:
+        return self._snapshot
+
+    def load(self, items: list[dict], version: int) -> bool:
+        if version < self.version:
+            return False
+        self._snapshot = MappingProxyType(merge_pricing(items))
+        self.version = version
+        return True
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+
+
+class ProfilerBusy(Exception):
+    pass
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_qualname}".replace(";", ":")
+
+
+def _collapse(frame, max_depth: int) -> str:
+    labels = []
+    while frame is not None and len(labels) < max_depth:
+        labels.append(_frame_label(frame))
+        frame = frame.f_back
+    return ";".join(reversed(labels))
+
+
+class StackSampler:
+    def __init__(self, max_seconds: float = 60.0, max_depth: int = 64) -> None:
+        self.max_seconds = max_seconds
+        self.max_depth = max_depth
+        self._lock = threading.Lock()
+
+    def run(
+        self,
+        thread_ids: set[int] | None,
+        seconds: float,
+        interval_s: float = 0.005,
+        trace_allocations: bool = False,
+        top_allocations: int = 25,
+    ) -> dict:
+        if not self._lock.acquire(blocking=False):
+            raise ProfilerBusy("A profile is already running")
+        started_tracing = False
+        try:
+            seconds = min(max(seconds, 0.1), self.max_seconds)
+            interval_s = max(interval_s, 0.001)
+            if trace_allocations and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            own_id = threading.get_ident()
+            stacks: Counter[str] = Counter()
+            samples = 0
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                for thread_id, frame in sys._current_frames().items():
+                    if thread_id == own_id or (thread_ids is not None and thread_id not in thread_ids):
+                        continue
+                    stacks[_collapse(frame, self.max_depth)] += 1
+                samples += 1
+                time.sleep(interval_s)
+            result = {
+                "seconds": seconds,
+                "interval_ms": interval_s * 1000,
+                "samples": samples,
+                "collapsed": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common()),
+            }
+            if trace_allocations:
+                snapshot = tracemalloc.take_snapshot()
+                result["allocations"] = [
+                    {
+                        "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+                        "size_bytes": stat.size,
+                        "count": stat.count,
+                    }
+                    for stat in snapshot.statistics("lineno")[:top_allocations]
+                ]
+            return result
+        finally:
+            if started_tracing:
+                tracemalloc.stop()
+            self._lock.release()
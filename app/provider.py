@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import asyncio
 from abc import ABC, abstractmethod
 
 from dataclasses import dataclass
@@ -15,7 +16,7 @@ class ProviderResult:
     total_tokens: int
 
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class StreamChunk:
     content: str
     done: bool = False
@@ -32,3 +33,6 @@ class Provider(ABC):
     @abstractmethod
     async def stream(self, request: ChatRequest):
         raise NotImplementedError
+
+    async def generate_batch(self, requests: list[ChatRequest]) -> list[ProviderResult | BaseException]:
+        return await asyncio.gather(*(self.generate(request) for request in requests), return_exceptions=True)
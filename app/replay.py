@@ -0,0 +1,111 @@
+from __future__ import annotations
+
+import asyncio
+import time
+from collections import deque
+
+
+class ReplayGap(Exception):
+    def __init__(self, missing_from: int, available_from: int) -> None:
+        super().__init__(f"events {missing_from}..{available_from - 1} were evicted")
+        self.missing_from = missing_from
+        self.available_from = available_from
+
+
+class ReplayBuffer:
+    def __init__(self, stream_id: str, tenant_id: str, max_events: int, max_bytes: int) -> None:
+        self.stream_id = stream_id
+        self.tenant_id = tenant_id
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self.finished = False
+        self.finished_at: float | None = None
+        self._events: deque[str] = deque()
+        self._sizes: deque[int] = deque()
+        self._first_seq = 1
+        self._bytes = 0
+        self._changed = asyncio.Event()
+        self._task: asyncio.Task | None = None
+
+    @property
+    def last_seq(self) -> int:
+        return self._first_seq + len(self._events) - 1
+
+    def start(self, frames) -> None:
+        self._task = asyncio.ensure_future(self._produce(frames))
+
+    async def _produce(self, frames) -> None:
+        try:
+            async for frame in frames:
+                self.append(frame)
+        finally:
+            self.finish()
+
+    def append(self, frame: str) -> None:
+        size = len(frame.encode("utf-8"))
+        self._events.append(frame)
+        self._sizes.append(size)
+        self._bytes += size
+        while len(self._events) > 1 and (len(self._events) > self.max_events or self._bytes > self.max_bytes):
+            self._events.popleft()
+            self._bytes -= self._sizes.popleft()
+            self._first_seq += 1
+        self._notify()
+
+    def finish(self) -> None:
+        if self.finished:
+            return
+        self.finished = True
+        self.finished_at = time.monotonic()
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def can_resume(self, after_seq: int) -> bool:
+        return after_seq + 1 >= self._first_seq
+
+    async def follow(self, after_seq: int = 0):
+        next_seq = after_seq + 1
+        while True:
+            while next_seq <= self.last_seq:
+                index = next_seq - self._first_seq
+                if index < 0:
+                    raise ReplayGap(next_seq, self._first_seq)
+                yield self._events[index]
+                next_seq += 1
+            if self.finished:
+                return
+            await self._changed.wait()
+
+
+class ReplayStore:
+    def __init__(self, ttl_s: float, max_events: int, max_bytes: int) -> None:
+        self.ttl_s = ttl_s
+        self.max_events = max_events
+        self.max_bytes = max_bytes
+        self._buffers: dict[str, ReplayBuffer] = {}
+
+    def create(self, stream_id: str, tenant_id: str) -> ReplayBuffer:
+        self.sweep()
+        buffer = ReplayBuffer(stream_id, tenant_id, self.max_events, self.max_bytes)
+        self._buffers[stream_id] = buffer
+        return buffer
+
+    def get(self, stream_id: str) -> ReplayBuffer | None:
+        self.sweep()
+        return self._buffers.get(stream_id)
+
+    def sweep(self) -> None:
+        now = time.monotonic()
+        expired = [
+            stream_id
+            for stream_id, buffer in self._buffers.items()
+            if buffer.finished_at is not None and now - buffer.finished_at > self.ttl_s
+        ]
+        for stream_id in expired:
+            del self._buffers[stream_id]
+
+    def __len__(self) -> int:
+        return len(self._buffers)
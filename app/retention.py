@@ -0,0 +1,210 @@
+from __future__ import annotations
+
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import MetaData, Table, delete, insert, select, text, tuple_
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import OperationalError
+
+from app.db.models import Request as RequestModel
+from app.db.models import RequestPayload, Tenant, UsageEvent
+
+PARTITIONED_TABLES = ("requests", "usage_events", "request_payloads")
+# Dependent rows first so per-tenant deletes never leave them without their request.
+PARTITIONED_MODELS = (RequestPayload, UsageEvent, RequestModel)
+RETENTION_MODES = ("drop", "archive")
+RETENTION_LOCK_ID = 7_301_954_112
+PARTITION_LOCK_ID = 7_301_954_113
+
+
+def month_start(value: datetime) -> datetime:
+    value = value.astimezone(timezone.utc)
+    return datetime(value.year, value.month, 1, tzinfo=timezone.utc)
+
+
+def add_months(value: datetime, months: int) -> datetime:
+    index = value.year * 12 + value.month - 1 + months
+    return value.replace(year=index // 12, month=index % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+
+def ensure_partitions(conn: Connection, now: datetime, months_ahead: int) -> list[str]:
+    created = []
+    current = month_start(now)
+    for table in PARTITIONED_TABLES:
+        ranges = list_partitions(conn, table)
+        for offset in range(months_ahead + 1):
+            month = add_months(current, offset)
+            upper = add_months(month, 1)
+            # Skip months already covered, including by a *_legacy partition.
+            if any((lower is None or lower < upper) and month < high for _, lower, high in ranges):
+                continue
+            name = partition_name(table, month)
+            conn.execute(
+                text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF {table} "
+                    f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+                )
+            )
+            created.append(name)
+    return created
+
+
+def list_partitions(conn: Connection, table: str) -> list[tuple[str, datetime | None, datetime]]:
+    # Bounds come from the catalog; MINVALUE reads as None and the default partition is skipped.
+    rows = conn.execute(
+        text(
+            "SELECT child.relname, "
+            "(regexp_match(pg_get_expr(child.relpartbound, child.oid), 'FROM \\(''([^'']+)''\\)'))[1]::timestamptz, "
+            "(regexp_match(pg_get_expr(child.relpartbound, child.oid), 'TO \\(''([^'']+)''\\)'))[1]::timestamptz "
+            "FROM pg_inherits "
+            "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE parent.relname = :table"
+        ),
+        {"table": table},
+    ).all()
+    partitions = [(name, lower, upper) for name, lower, upper in rows if upper is not None]
+    return sorted(partitions, key=lambda item: item[2])
+
+
+def _retire_partition(
+    conn: Connection, table: str, name: str, mode: str, archive_schema: str, lock_timeout_ms: int
+) -> None:
+    # DETACH ... CONCURRENTLY is refused while the parent has a DEFAULT partition, which
+    # every partitioned table here keeps as a safety net. A plain DETACH is catalog-only,
+    # so the exposure is the wait for the parent lock; lock_timeout caps that wait and
+    # the partition is retried on the next run.
+    conn.execute(text(f"SET LOCAL lock_timeout = {int(lock_timeout_ms)}"))
+    conn.execute(text(f"ALTER TABLE {table} DETACH PARTITION {name}"))
+    if mode == "archive":
+        conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+        conn.execute(text(f"ALTER TABLE {name} SET SCHEMA {archive_schema}"))
+    else:
+        conn.execute(text(f"DROP TABLE {name}"))
+
+
+def _archive_table(model, archive_schema: str) -> Table:
+    return model.__table__.to_metadata(MetaData(), schema=archive_schema, name=f"{model.__tablename__}_expired")
+
+
+def _ensure_archive_tables(conn: Connection, archive_schema: str) -> None:
+    conn.execute(text(f"CREATE SCHEMA IF NOT EXISTS {archive_schema}"))
+    for model in PARTITIONED_MODELS:
+        table = model.__tablename__
+        conn.execute(text(f"CREATE TABLE IF NOT EXISTS {archive_schema}.{table}_expired (LIKE {table})"))
+
+
+def _delete_expired(
+    conn: Connection, tenant_id, cutoff: datetime, batch_size: int, archive_schema: str | None = None
+) -> int:
+    # With an archive schema, each batch is moved (DELETE ... RETURNING into the archive) in one statement.
+    deleted = 0
+    for model in PARTITIONED_MODELS:
+        archive = _archive_table(model, archive_schema) if archive_schema else None
+        while True:
+            batch = (
+                select(model.id, model.created_at)
+                .where(model.tenant_id == tenant_id)
+                .where(model.created_at < cutoff)
+                .limit(batch_size)
+            )
+            stmt = delete(model).where(tuple_(model.id, model.created_at).in_(batch))
+            if archive is not None:
+                moved = stmt.returning(*model.__table__.columns).cte("moved")
+                stmt = insert(archive).from_select(list(model.__table__.columns.keys()), select(moved))
+            with conn.begin():
+                count = conn.execute(stmt).rowcount
+            deleted += count
+            if count < batch_size:
+                break
+    return deleted
+
+
+def maintain_partitions(engine: Engine, months_ahead: int = 3, now: datetime | None = None) -> dict:
+    # Runs on its own schedule: rows for a month with no partition land in DEFAULT, and that
+    # month's partition can then no longer be created.
+    if engine.dialect.name != "postgresql":
+        return {"skipped": "unsupported_dialect"}
+    now = now or datetime.now(timezone.utc)
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": PARTITION_LOCK_ID}).scalar():
+            conn.rollback()
+            return {"skipped": "locked"}
+        conn.commit()
+        try:
+            with conn.begin():
+                created = ensure_partitions(conn, now, months_ahead)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": PARTITION_LOCK_ID})
+            conn.commit()
+    return {"created": created}
+
+
+def run_retention(
+    engine: Engine,
+    mode: str = "drop",
+    default_days: int | None = None,
+    batch_size: int = 5000,
+    archive_schema: str = "archive",
+    lock_timeout_ms: int = 2000,
+    now: datetime | None = None,
+) -> dict:
+    if engine.dialect.name != "postgresql":
+        return {"skipped": "unsupported_dialect"}
+    if mode not in RETENTION_MODES:
+        raise ValueError(f"unknown retention mode: {mode}")
+    now = now or datetime.now(timezone.utc)
+
+    with engine.connect() as conn:
+        if not conn.execute(text("SELECT pg_try_advisory_lock(:id)"), {"id": RETENTION_LOCK_ID}).scalar():
+            conn.rollback()
+            return {"skipped": "locked"}
+        conn.commit()
+        try:
+            with conn.begin():
+                tenants = conn.execute(select(Tenant.id, Tenant.retention_days)).all()
+                if mode == "archive":
+                    _ensure_archive_tables(conn, archive_schema)
+
+            effective = {tenant_id: days if days is not None else default_days for tenant_id, days in tenants}
+            retired = []
+            deferred = []
+            # A whole month can only go once it is past the longest retention of any tenant.
+            if effective and None not in effective.values():
+                horizon = now - timedelta(days=max(effective.values()))
+                with conn.begin():
+                    expired = [
+                        (table, name)
+                        for table in PARTITIONED_TABLES
+                        for name, _, upper in list_partitions(conn, table)
+                        if upper <= horizon
+                    ]
+                for table, name in expired:
+                    try:
+                        with conn.begin():
+                            _retire_partition(conn, table, name, mode, archive_schema, lock_timeout_ms)
+                    except OperationalError:
+                        deferred.append(name)
+                        continue
+                    retired.append(name)
+
+            deleted = 0
+            for tenant_id, days in effective.items():
+                if days is not None:
+                    deleted += _delete_expired(
+                        conn,
+                        tenant_id,
+                        now - timedelta(days=days),
+                        batch_size,
+                        archive_schema if mode == "archive" else None,
+                    )
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": RETENTION_LOCK_ID})
+            conn.commit()
+
+    rows_key = "archived_rows" if mode == "archive" else "deleted_rows"
+    return {"mode": mode, "retired": retired, "deferred": deferred, rows_key: deleted}
@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import math
+import time
+
+WINDOWS = {"1m": 60, "5m": 300, "15m": 900}
+SUB_BUCKETS = 16
+
+
+def bucket_index(value_ms: float) -> int:
+    if value_ms < 1:
+        return 0
+    mantissa, exponent = math.frexp(value_ms)
+    return exponent * SUB_BUCKETS + int((mantissa - 0.5) * 2 * SUB_BUCKETS)
+
+
+def bucket_value(index: int) -> float:
+    if index <= 0:
+        return 0.0
+    exponent, sub = divmod(index, SUB_BUCKETS)
+    return math.ldexp(0.5 + (sub + 0.5) / (2 * SUB_BUCKETS), exponent)
+
+
+class WindowStats:
+    __slots__ = ("count", "errors", "cache_hits", "cache_lookups", "tokens", "cost", "rate_limited", "latency")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.errors = 0
+        self.cache_hits = 0
+        self.cache_lookups = 0
+        self.tokens = 0
+        self.cost = 0.0
+        self.rate_limited = 0
+        self.latency: dict[int, int] = {}
+
+    def merge(self, other: "WindowStats", sign: int = 1) -> None:
+        self.count += sign * other.count
+        self.errors += sign * other.errors
+        self.cache_hits += sign * other.cache_hits
+        self.cache_lookups += sign * other.cache_lookups
+        self.tokens += sign * other.tokens
+        self.cost += sign * other.cost
+        self.rate_limited += sign * other.rate_limited
+        latency = self.latency
+        for index, n in other.latency.items():
+            total = latency.get(index, 0) + sign * n
+            if total > 0:
+                latency[index] = total
+            else:
+                latency.pop(index, None)
+
+    def empty(self) -> bool:
+        return self.count <= 0 and self.rate_limited <= 0
+
+    def quantile(self, q: float) -> float:
+        total = sum(self.latency.values())
+        if total <= 0:
+            return 0.0
+        rank = q * total
+        seen = 0
+        for index in sorted(self.latency):
+            seen += self.latency[index]
+            if seen >= rank:
+                return bucket_value(index)
+        return 0.0
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "errors": self.errors,
+            "cache_hits": self.cache_hits,
+            "cache_lookups": self.cache_lookups,
+            "tokens": self.tokens,
+            "cost": self.cost,
+            "rate_limited": self.rate_limited,
+            "latency": {str(k): v for k, v in self.latency.items()},
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "WindowStats":
+        stats = cls()
+        stats.count = int(data.get("count", 0))
+        stats.errors = int(data.get("errors", 0))
+        stats.cache_hits = int(data.get("cache_hits", 0))
+        stats.cache_lookups = int(data.get("cache_lookups", 0))
+        stats.tokens = int(data.get("tokens", 0))
+        stats.cost = float(data.get("cost", 0.0))
+        stats.rate_limited = int(data.get("rate_limited", 0))
+        stats.latency = {int(k): int(v) for k, v in (data.get("latency") or {}).items()}
+        return stats
+
+
+class RollingMetrics:
+    def __init__(self, slot_s: int = 10, windows: dict[str, int] | None = None) -> None:
+        self.slot_s = slot_s
+        self.windows = {name: max(1, seconds // slot_s) for name, seconds in (windows or WINDOWS).items()}
+        self._max_slots = max(self.windows.values())
+        self._started = time.time()
+        self._current = int(self._started // slot_s)
+        self._slots: dict[int, dict[str, WindowStats]] = {}
+        self._floors = {name: self._current - n + 1 for name, n in self.windows.items()}
+        self._aggregates: dict[str, dict[str, WindowStats]] = {name: {} for name in self.windows}
+        self._peers: dict[str, dict[str, WindowStats]] = {name: {} for name in self.windows}
+
+    def _advance(self, now: float) -> None:
+        current = int(now // self.slot_s)
+        if current == self._current:
+            return
+        self._current = current
+        for name, n in self.windows.items():
+            floor = current - n + 1
+            aggregate = self._aggregates[name]
+            for index in sorted(k for k in self._slots if self._floors[name] <= k < floor):
+                for key, stats in self._slots[index].items():
+                    existing = aggregate.get(key)
+                    if existing is None:
+                        continue
+                    existing.merge(stats, sign=-1)
+                    if existing.empty():
+                        del aggregate[key]
+            self._floors[name] = floor
+        oldest = current - self._max_slots + 1
+        for index in [k for k in self._slots if k < oldest]:
+            del self._slots[index]
+
+    def _add(self, keys: tuple[str, ...], stats: WindowStats, now: float | None = None) -> None:
+        self._advance(now if now is not None else time.time())
+        slot = self._slots.setdefault(self._current, {})
+        for key in keys:
+            slot.setdefault(key, WindowStats()).merge(stats)
+            for aggregate in self._aggregates.values():
+                aggregate.setdefault(key, WindowStats()).merge(stats)
+
+    def record(
+        self,
+        tenant: str,
+        model: str,
+        provider: str,
+        latency_ms: float,
+        success: bool,
+        tokens: int = 0,
+        cost: float = 0.0,
+        cache_hit: bool | None = None,
+    ) -> None:
+        stats = WindowStats()
+        stats.count = 1
+        stats.errors = 0 if success else 1
+        if cache_hit is not None:
+            stats.cache_lookups = 1
+            stats.cache_hits = 1 if cache_hit else 0
+        stats.tokens = tokens
+        stats.cost = cost
+        stats.latency = {bucket_index(latency_ms): 1}
+        self._add(("global", f"tenant:{tenant}", f"model:{model}", f"provider:{provider}"), stats)
+
+    def record_rate_limited(self) -> None:
+        stats = WindowStats()
+        stats.rate_limited = 1
+        self._add(("global",), stats)
+
+    def snapshot(self) -> dict:
+        self._advance(time.time())
+        return {
+            name: {key: stats.to_dict() for key, stats in aggregate.items()}
+            for name, aggregate in self._aggregates.items()
+        }
+
+    def load_peers(self, snapshots: list[dict]) -> None:
+        peers: dict[str, dict[str, WindowStats]] = {name: {} for name in self.windows}
+        for snapshot in snapshots:
+            for name, series in snapshot.items():
+                if name not in peers:
+                    continue
+                for key, data in series.items():
+                    peers[name].setdefault(key, WindowStats()).merge(WindowStats.from_dict(data))
+        self._peers = peers
+
+    def summary(self, key: str = "global", window: str = "5m") -> dict:
+        now = time.time()
+        self._advance(now)
+        stats = WindowStats()
+        local = self._aggregates[window].get(key)
+        if local is not None:
+            stats.merge(local)
+        peer = self._peers[window].get(key)
+        if peer is not None:
+            stats.merge(peer)
+        seconds = min(self.windows[window] * self.slot_s, max(now - self._started, 1.0))
+        return {
+            "window": window,
+            "requests": stats.count,
+            "request_rate_per_s": stats.count / seconds,
+            "error_rate": (stats.errors / stats.count) if stats.count else 0.0,
+            "p50_latency_ms": stats.quantile(0.50),
+            "p95_latency_ms": stats.quantile(0.95),
+            "p99_latency_ms": stats.quantile(0.99),
+            "cache_hit_rate": (stats.cache_hits / stats.cache_lookups) if stats.cache_lookups else 0.0,
+            "rate_limited_per_s": stats.rate_limited / seconds,
+            "tokens_total": float(stats.tokens),
+            "tokens_per_s": stats.tokens / seconds,
+            "cost_total": stats.cost,
+        }
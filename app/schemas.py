@@ -52,6 +52,7 @@ class ApiKeyInfo(BaseModel):
 
 class ApiKeyListResponse(BaseModel):
     keys: list[ApiKeyInfo]
+    next_cursor: str | None = None
 
 
 class LimitsRequest(BaseModel):
@@ -66,6 +67,16 @@ class LimitsResponse(BaseModel):
     spend_limit_per_day_usd: float | None
 
 
+class RetentionRequest(BaseModel):
+    tenant: str = Field(min_length=1)
+    retention_days: int | None = Field(default=None, gt=0)
+
+
+class RetentionResponse(BaseModel):
+    tenant: str
+    retention_days: int | None
+
+
 class UsageSummaryResponse(BaseModel):
     tenant: str
     requests: int
@@ -86,14 +97,19 @@ class PricingResponse(BaseModel):
 
 class ObservabilitySummaryResponse(BaseModel):
     request_rate_per_s: float
-    error_rate: float
-    p95_latency_ms: float
+    error_rate: float | None
+    p95_latency_ms: float | None
     cache_hit_rate: float
-    rate_limited_per_s: float
+    rate_limited_per_s: float | None
     tokens_total: float
     cost_total: float
     scope: str
     tenant: str | None = None
+    p50_latency_ms: float | None = None
+    p99_latency_ms: float | None = None
+    tokens_per_s: float | None = None
+    window: str | None = None
+    source: str | None = None
 
 
 class UiKeysTelemetryRequest(BaseModel):
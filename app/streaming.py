@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import asyncio
+import json
+
+from app.deadline import Deadline, DeadlineExceeded, StreamIdleTimeout
+from app.provider import StreamChunk
+
+
+def encode_str(value: str) -> str:
+    return json.dumps(value)
+
+
+class NDJSONSplitter:
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+
+    def feed(self, data: bytes) -> list[bytearray]:
+        self._buffer += data
+        if b"\n" not in data:
+            return []
+        *lines, self._buffer = self._buffer.split(b"\n")
+        return [line for line in lines if line and not line.isspace()]
+
+    def flush(self) -> list[bytearray]:
+        tail, self._buffer = self._buffer, bytearray()
+        return [tail] if tail and not tail.isspace() else []
+
+
+class SSEEnvelope:
+    def __init__(self, response_id: str, model: str, created: int) -> None:
+        header = json.dumps(
+            {"id": response_id, "model": model, "created": created},
+            separators=(",", ":"),
+        )
+        self._prefix = f"data: {header[:-1]},\"content\":"
+        self._suffix = ",\"done\":false}\n\n"
+
+    def content(self, text: str) -> str:
+        return self._prefix + encode_str(text) + self._suffix
+
+
+async def coalesce_chunks(chunks, max_delay_ms: int, max_bytes: int):
+    iterator = chunks.__aiter__()
+    loop = asyncio.get_running_loop()
+    max_delay = max_delay_ms / 1000
+    pending: list[str] = []
+    pending_size = 0
+    deadline = None
+    last_flush = None
+    next_task = None
+    try:
+        while True:
+            if next_task is None:
+                next_task = asyncio.ensure_future(iterator.__anext__())
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            finished, _ = await asyncio.wait({next_task}, timeout=timeout)
+            if not finished:
+                yield StreamChunk(content="".join(pending))
+                pending, pending_size, deadline = [], 0, None
+                last_flush = loop.time()
+                continue
+            task, next_task = next_task, None
+            try:
+                chunk = task.result()
+            except StopAsyncIteration:
+                break
+            if chunk.done:
+                if pending:
+                    yield StreamChunk(content="".join(pending))
+                    pending, pending_size = [], 0
+                yield chunk
+                return
+            if not chunk.content:
+                continue
+            now = loop.time()
+            # First token, and tokens after an idle gap, go out immediately.
+            if not pending and (last_flush is None or now - last_flush >= max_delay):
+                yield chunk
+                last_flush = now
+                continue
+            pending.append(chunk.content)
+            pending_size += len(chunk.content)
+            if pending_size >= max_bytes:
+                yield StreamChunk(content="".join(pending))
+                pending, pending_size, deadline = [], 0, None
+                last_flush = now
+            elif deadline is None:
+                deadline = now + max_delay
+        if pending:
+            yield StreamChunk(content="".join(pending))
+    finally:
+        if next_task is not None:
+            next_task.cancel()
+            await asyncio.gather(next_task, return_exceptions=True)
+        aclose = getattr(iterator, "aclose", None)
+        if aclose is not None:
+            await aclose()
+
+
+_END = object()
+_CANCELED = object()
+
+
+class DisconnectWatcher:
+    def __init__(self, receive) -> None:
+        self._receive = receive
+        self._watch_task: asyncio.Task | None = None
+        self._pumps: set[asyncio.Task] = set()
+        self.disconnected = False
+
+    def start(self) -> None:
+        if self._watch_task is None:
+            self._watch_task = asyncio.ensure_future(self._watch())
+
+    async def stop(self) -> None:
+        if self._watch_task is not None:
+            self._watch_task.cancel()
+            await asyncio.gather(self._watch_task, return_exceptions=True)
+            self._watch_task = None
+
+    async def _watch(self) -> None:
+        while True:
+            message = await self._receive()
+            if message.get("type") == "http.disconnect":
+                break
+        self.disconnected = True
+        for pump in list(self._pumps):
+            pump.cancel()
+
+    async def guard(self, chunks, idle_timeout_s: float | None = None, deadline: Deadline | None = None):
+        if self.disconnected:
+            aclose = getattr(chunks, "aclose", None)
+            if aclose is not None:
+                await aclose()
+            raise asyncio.CancelledError()
+        # One slot: the upstream only runs ahead of the client by a single chunk.
+        queue: asyncio.Queue = asyncio.Queue(maxsize=1)
+
+        async def _pump():
+            try:
+                async for chunk in chunks:
+                    await queue.put(chunk)
+                await queue.put(_END)
+            except asyncio.CancelledError:
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_CANCELED)
+                # Canceled while blocked in put: the upstream is suspended, not closed.
+                aclose = getattr(chunks, "aclose", None)
+                if aclose is not None:
+                    await aclose()
+                raise
+            except Exception as exc:
+                await queue.put(exc)
+
+        pump = asyncio.ensure_future(_pump())
+        self._pumps.add(pump)
+        try:
+            while True:
+                timeout = idle_timeout_s
+                if deadline is not None:
+                    remaining = deadline.remaining()
+                    timeout = remaining if timeout is None else min(timeout, remaining)
+                if timeout is None:
+                    item = await queue.get()
+                else:
+                    try:
+                        item = await asyncio.wait_for(queue.get(), timeout)
+                    except TimeoutError:
+                        if deadline is not None and deadline.expired():
+                            raise DeadlineExceeded()
+                        raise StreamIdleTimeout()
+                if item is _END:
+                    return
+                if item is _CANCELED:
+                    raise asyncio.CancelledError()
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            self._pumps.discard(pump)
+            pump.cancel()
+            await asyncio.gather(pump, return_exceptions=True)
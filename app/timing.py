@@ -0,0 +1,36 @@
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    __slots__ = ("stages",)
+
+    def __init__(self) -> None:
+        self.stages: dict[str, float] = {}
+
+    def add(self, stage: str, seconds: float) -> None:
+        self.stages[stage] = self.stages.get(stage, 0.0) + seconds
+
+    @contextmanager
+    def stage(self, stage: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(stage, time.perf_counter() - start)
+
+    def as_ms(self) -> dict[str, float]:
+        return {stage: round(seconds * 1000, 2) for stage, seconds in self.stages.items()}
+
+    def server_timing(self) -> str:
+        return ", ".join(f"{stage};dur={seconds * 1000:.2f}" for stage, seconds in self.stages.items())
+
+
+class _NullTimer(StageTimer):
+    def add(self, stage: str, seconds: float) -> None:
+        return None
+
+
+NULL_TIMER = _NullTimer()
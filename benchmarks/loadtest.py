@@ -0,0 +1,432 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from dataclasses import dataclass
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_TRACE = REPO_ROOT / "requests.jsonl"
+DEFAULT_BASELINE = Path(__file__).resolve().parent / "baselines" / "loadtest.json"
+
+
+@dataclass(frozen=True)
+class TraceEvent:
+    at_s: float
+    tenant: str
+    stream: bool
+    payload: dict
+    abandon: bool = False
+
+
+@dataclass
+class Sample:
+    kind: str
+    tenant: str
+    status: int | None
+    latency_s: float
+    ttft_s: float | None
+    error: str | None
+    abandoned: bool = False
+
+
+def load_trace(
+    path: Path,
+    tenants: list[str],
+    rate_per_s: float,
+    stream_ratio: float,
+    seed: int,
+    limit: int | None = None,
+    repeat: int = 1,
+    abandon_ratio: float = 0.0,
+) -> list[TraceEvent]:
+    rng = random.Random(seed)
+    records = []
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line:
+                records.append(json.loads(line))
+    records = records * max(repeat, 1)
+    if limit is not None:
+        records = records[:limit]
+
+    events = []
+    clock = 0.0
+    for index, record in enumerate(records):
+        # Trace lines may carry a real arrival offset and chat payload; backlog-style
+        # lines (title/body) get Poisson arrivals and the body as the prompt.
+        if "t" in record:
+            at_s = float(record["t"])
+        else:
+            clock += rng.expovariate(rate_per_s)
+            at_s = clock
+        messages = record.get("messages") or [
+            {"role": "user", "content": record.get("body") or record.get("title") or "hello"}
+        ]
+        stream = bool(record["stream"]) if "stream" in record else rng.random() < stream_ratio
+        payload = {"model": record.get("model", "auto"), "messages": messages}
+        if record.get("max_tokens"):
+            payload["max_tokens"] = record["max_tokens"]
+        tenant = record.get("tenant") or tenants[index % len(tenants)]
+        abandon = stream and abandon_ratio > 0 and rng.random() < abandon_ratio
+        events.append(TraceEvent(at_s=at_s, tenant=tenant, stream=stream, payload=payload, abandon=abandon))
+    events.sort(key=lambda event: event.at_s)
+    return events
+
+
+def _stream_error(body: bytes) -> str | None:
+    for line in body.split(b"\n"):
+        if not line.startswith(b"data: {"):
+            continue
+        try:
+            data = json.loads(line[6:])
+        except ValueError:
+            continue
+        if isinstance(data, dict) and isinstance(data.get("error"), dict):
+            return data["error"].get("code") or "stream_error"
+    return None
+
+
+def _error_code(status: int, body: bytes) -> str | None:
+    if status >= 400:
+        try:
+            return json.loads(body)["error"]["code"]
+        except (ValueError, KeyError, TypeError):
+            return f"http_{status}"
+    return None
+
+
+async def asgi_call(
+    app, path: str, headers: dict[str, str], body: bytes, abandon_after: int | None = None
+) -> tuple[int, float | None, bytes]:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "POST",
+        "scheme": "http",
+        "path": path,
+        "raw_path": path.encode(),
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(k.lower().encode(), v.encode()) for k, v in headers.items()],
+        "client": ("127.0.0.1", 50000),
+        "server": ("loadtest", 80),
+    }
+    gone = asyncio.Event()
+    sent_body = False
+    status = 0
+    first_byte_at: float | None = None
+    chunks: list[bytes] = []
+
+    async def receive():
+        nonlocal sent_body
+        if not sent_body:
+            sent_body = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        await gone.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, first_byte_at
+        if message["type"] == "http.response.start":
+            status = message["status"]
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            if chunk:
+                if first_byte_at is None:
+                    first_byte_at = time.perf_counter()
+                if not gone.is_set():
+                    chunks.append(chunk)
+                if abandon_after is not None and len(chunks) >= abandon_after:
+                    gone.set()
+            if not message.get("more_body", False):
+                gone.set()
+
+    try:
+        await app(scope, receive, send)
+    finally:
+        gone.set()
+    return status, first_byte_at, b"".join(chunks)
+
+
+class AsgiTarget:
+    def __init__(self, app) -> None:
+        self.app = app
+
+    async def call(
+        self, path: str, headers: dict[str, str], body: bytes, abandon_after: int | None = None
+    ) -> tuple[int, float | None, bytes]:
+        return await asgi_call(self.app, path, headers, body, abandon_after)
+
+    async def close(self) -> None:
+        return None
+
+
+class HttpTarget:
+    def __init__(self, base_url: str, timeout_s: float) -> None:
+        import httpx
+
+        self.client = httpx.AsyncClient(base_url=base_url, timeout=timeout_s)
+
+    async def call(
+        self, path: str, headers: dict[str, str], body: bytes, abandon_after: int | None = None
+    ) -> tuple[int, float | None, bytes]:
+        first_byte_at = None
+        chunks = []
+        async with self.client.stream("POST", path, headers=headers, content=body) as response:
+            async for chunk in response.aiter_raw():
+                if chunk and first_byte_at is None:
+                    first_byte_at = time.perf_counter()
+                chunks.append(chunk)
+                if abandon_after is not None and len(chunks) >= abandon_after:
+                    break
+        return response.status_code, first_byte_at, b"".join(chunks)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+async def _fire(target, event: TraceEvent, api_key: str, abandon_after: int = 2) -> Sample:
+    path = "/v1/chat/stream" if event.stream else "/v1/chat"
+    headers = {"content-type": "application/json", "x-api-key": api_key}
+    body = json.dumps(event.payload).encode()
+    kind = "stream" if event.stream else "chat"
+    start = time.perf_counter()
+    try:
+        status, first_byte_at, content = await target.call(
+            path, headers, body, abandon_after if event.abandon else None
+        )
+    except Exception as exc:
+        return Sample(kind, event.tenant, None, time.perf_counter() - start, None, type(exc).__name__, event.abandon)
+    latency_s = time.perf_counter() - start
+    error = _error_code(status, content)
+    if error is None and event.stream:
+        error = _stream_error(content)
+    ttft_s = first_byte_at - start if (event.stream and first_byte_at is not None and error is None) else None
+    return Sample(kind, event.tenant, status, latency_s, ttft_s, error, event.abandon)
+
+
+async def replay(
+    target, events: list[TraceEvent], api_keys: dict[str, str], speed: float, abandon_after: int = 2
+) -> tuple[list[Sample], float]:
+    start = time.perf_counter()
+
+    async def scheduled(event: TraceEvent) -> Sample:
+        delay = event.at_s / speed - (time.perf_counter() - start)
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return await _fire(target, event, api_keys[event.tenant], abandon_after)
+
+    samples = await asyncio.gather(*(scheduled(event) for event in events))
+    return list(samples), time.perf_counter() - start
+
+
+def percentiles(values: list[float]) -> dict[str, float | None]:
+    if not values:
+        return {"p50": None, "p95": None, "p99": None}
+    ordered = sorted(values)
+
+    def rank(q: float) -> float:
+        index = min(len(ordered) - 1, max(0, math.ceil(q * len(ordered)) - 1))
+        return round(ordered[index] * 1000, 2)
+
+    return {"p50": rank(0.50), "p95": rank(0.95), "p99": rank(0.99)}
+
+
+class UpstreamTokenCounter:
+    def __init__(self) -> None:
+        self.generations: list[int] = []
+
+    def wrap(self, provider) -> None:
+        stream = provider.stream
+
+        async def counted(request):
+            index = len(self.generations)
+            self.generations.append(0)
+            async for chunk in stream(request):
+                if chunk.content:
+                    self.generations[index] += 1
+                yield chunk
+
+        provider.stream = counted
+
+    def report(self) -> dict:
+        full = max(self.generations, default=0)
+        produced = sum(self.generations)
+        return {
+            "generations": len(self.generations),
+            "tokens": produced,
+            "tokens_per_full_generation": full,
+            # Chunks a generation would have produced had every stream run to completion.
+            "tokens_saved": full * len(self.generations) - produced,
+        }
+
+
+def build_report(samples: list[Sample], wall_s: float, meta: dict, upstream: dict | None = None) -> dict:
+    ok = [sample for sample in samples if sample.error is None]
+    completed = [sample for sample in ok if not sample.abandoned]
+    errors = Counter(f"{sample.status or 'exc'}:{sample.error}" for sample in samples if sample.error is not None)
+    by_kind = {}
+    for kind in ("chat", "stream"):
+        subset = [sample for sample in samples if sample.kind == kind]
+        if not subset:
+            continue
+        by_kind[kind] = {
+            "requests": len(subset),
+            "errors": sum(1 for sample in subset if sample.error is not None),
+            "latency_ms": percentiles([sample.latency_s for sample in subset if sample.error is None and not sample.abandoned]),
+        }
+    report = {
+        **meta,
+        "requests": len(samples),
+        "wall_s": round(wall_s, 3),
+        "throughput_rps": round(len(ok) / wall_s, 2) if wall_s > 0 else 0.0,
+        "error_rate": round((len(samples) - len(ok)) / len(samples), 4) if samples else 0.0,
+        "latency_ms": percentiles([sample.latency_s for sample in completed]),
+        "ttft_ms": percentiles([sample.ttft_s for sample in ok if sample.ttft_s is not None]),
+        "by_kind": by_kind,
+        "errors": dict(errors.most_common()),
+    }
+    abandoned = sum(1 for sample in samples if sample.abandoned)
+    if abandoned:
+        report["abandoned"] = abandoned
+    if upstream is not None:
+        report["upstream"] = upstream
+    return report
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list[str]:
+    regressions = []
+    base_rps = baseline.get("throughput_rps") or 0.0
+    if base_rps and report["throughput_rps"] < base_rps * (1 - tolerance):
+        regressions.append(f"throughput_rps {report['throughput_rps']} < baseline {base_rps}")
+    for metric in ("latency_ms", "ttft_ms"):
+        for q in ("p50", "p95", "p99"):
+            current = report[metric].get(q)
+            base = (baseline.get(metric) or {}).get(q)
+            if current is not None and base and current > base * (1 + tolerance):
+                regressions.append(f"{metric}.{q} {current} > baseline {base}")
+    if report["error_rate"] > baseline.get("error_rate", 0.0) + 0.01:
+        regressions.append(f"error_rate {report['error_rate']} > baseline {baseline.get('error_rate', 0.0)}")
+    return regressions
+
+
+def _prepare_in_process(args, tenants: list[tuple[str, str]]):
+    os.environ.setdefault("PROVIDER_MODE", "mock")
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='gw-loadtest-')}/gateway.db")
+    os.environ.setdefault("REQUESTS_PER_MINUTE", "100000000")
+    os.environ.setdefault("TOKENS_PER_MINUTE", "100000000")
+    sys.path.insert(0, str(REPO_ROOT))
+
+    import logging
+
+    from benchmarks.standins import InMemoryRedis, seed_database
+
+    api_keys = seed_database(tenants)
+
+    import app.main as gateway
+
+    if not args.app_logs:
+        logging.getLogger("llm-gateway").setLevel(logging.WARNING)
+    gateway.redis_client = InMemoryRedis()
+    counter = UpstreamTokenCounter()
+    for provider in gateway.providers.values():
+        counter.wrap(provider)
+    return AsgiTarget(gateway.app), api_keys, counter
+
+
+async def _run(args) -> dict:
+    tenants = [(f"tenant-{i}", "pro" if i % 2 else "free") for i in range(args.tenants)]
+    events = load_trace(
+        Path(args.trace),
+        [name for name, _ in tenants],
+        args.rate,
+        args.stream_ratio,
+        args.seed,
+        args.limit,
+        args.repeat,
+        args.abandon_ratio,
+    )
+    known = {name for name, _ in tenants}
+    tenants += [(name, "free") for name in sorted({event.tenant for event in events} - known)]
+    if args.url:
+        if not args.api_key:
+            raise SystemExit("--api-key is required with --url")
+        target = HttpTarget(args.url, args.timeout)
+        api_keys = {name: args.api_key[i % len(args.api_key)] for i, (name, _) in enumerate(tenants)}
+        counter = None
+    else:
+        target, api_keys, counter = _prepare_in_process(args, tenants)
+    try:
+        samples, wall_s = await replay(target, events, api_keys, args.speed, args.abandon_after)
+    finally:
+        await target.close()
+    meta = {
+        "mode": "http" if args.url else "asgi",
+        "trace": str(args.trace),
+        "seed": args.seed,
+        "rate_per_s": args.rate,
+        "speed": args.speed,
+        "stream_ratio": args.stream_ratio,
+        "tenants": args.tenants,
+    }
+    if args.abandon_ratio > 0:
+        meta["abandon_ratio"] = args.abandon_ratio
+        meta["abandon_after_chunks"] = args.abandon_after
+    return build_report(samples, wall_s, meta, counter.report() if counter is not None else None)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Replay a JSONL request trace against the gateway.")
+    parser.add_argument("--trace", default=str(DEFAULT_TRACE))
+    parser.add_argument("--url", help="Target a running gateway instead of the in-process ASGI app")
+    parser.add_argument("--api-key", action="append", help="API key(s) to use with --url")
+    parser.add_argument("--tenants", type=int, default=4)
+    parser.add_argument("--rate", type=float, default=20.0, help="Mean arrival rate for lines without 't'")
+    parser.add_argument("--speed", type=float, default=1.0, help="Replay speed multiplier")
+    parser.add_argument("--stream-ratio", type=float, default=0.5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--limit", type=int)
+    parser.add_argument("--repeat", type=int, default=1)
+    parser.add_argument("--abandon-ratio", type=float, default=0.0, help="Fraction of streams the client drops early")
+    parser.add_argument("--abandon-after", type=int, default=2, help="Body chunks read before an abandoning client disconnects")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--app-logs", action="store_true")
+    parser.add_argument("--output", help="Write the JSON report to this path")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--write-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(_run(args))
+    text = json.dumps(report, indent=2)
+    print(text)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding="utf-8")
+
+    baseline_path = Path(args.baseline)
+    if args.write_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(text + "\n", encoding="utf-8")
+        return 0
+    if not baseline_path.exists():
+        print(f"no baseline at {baseline_path}; skipping regression check", file=sys.stderr)
+        return 0
+    regressions = compare(report, json.loads(baseline_path.read_text(encoding="utf-8")), args.tolerance)
+    for regression in regressions:
+        print(f"REGRESSION: {regression}", file=sys.stderr)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
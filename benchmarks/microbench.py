@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import timeit
+import tracemalloc
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+MESSAGE_COUNTS = (1, 10, 100)
+PROMPT = (
+    "Summarize the following incident report and list the follow-up actions owned by each team. "
+    "Keep the answer under two hundred words and call out anything that blocks the release."
+)
+
+
+def _messages(count: int) -> list[dict]:
+    roles = ("user", "assistant")
+    return [{"role": roles[i % 2], "content": f"{PROMPT} ({i})"} for i in range(count)]
+
+
+def build_benchmarks() -> dict:
+    os.environ.setdefault("LOG_SAMPLE_DEFAULT", "0")
+    sys.path.insert(0, str(REPO_ROOT))
+
+    from prometheus_client import generate_latest
+
+    import app.main as gateway
+    from app.auth import hash_api_key
+    from app.pricing import cost_usd, merge_pricing
+    from app.routing import ProviderHealth, RoutingPolicy
+    from app.schemas import ChatRequest
+    from app.ollama_provider import _parse_stream_line
+    from app.provider import StreamChunk
+    from app.streaming import NDJSONSplitter, SSEEnvelope
+
+    benchmarks = {}
+    for count in MESSAGE_COUNTS:
+        payload = ChatRequest(model="auto", messages=_messages(count))
+        benchmarks[f"cache_key[{count}]"] = lambda payload=payload: gateway._cache_key("tenant-1", payload)
+        benchmarks[f"estimate_tokens[{count}]"] = (
+            lambda messages=payload.messages: gateway._estimate_tokens(messages, PROMPT)
+        )
+
+    sse_payload = {
+        "id": "0f8fad5b-d9cb-469f-a165-70867728950e",
+        "model": "mock-1",
+        "created": 1700000000,
+        "content": "token ",
+        "done": False,
+    }
+    benchmarks["format_sse"] = lambda: gateway._format_sse(sse_payload)
+    envelope = SSEEnvelope(sse_payload["id"], sse_payload["model"], sse_payload["created"])
+    benchmarks["sse_envelope"] = lambda: envelope.content("token ")
+
+    ndjson = b"".join(
+        json.dumps({"model": "llama3.1:8b", "message": {"role": "assistant", "content": f"tok{i} "}, "done": False}).encode()
+        + b"\n"
+        for i in range(32)
+    )
+
+    def split_ndjson():
+        splitter = NDJSONSplitter()
+        splitter.feed(ndjson)
+        splitter.flush()
+
+    benchmarks["ndjson_split[32]"] = split_ndjson
+
+    stream_request = ChatRequest(model="llama3.1:8b", messages=_messages(1))
+
+    def parse_bytes():
+        splitter = NDJSONSplitter()
+        for line in splitter.feed(ndjson):
+            _parse_stream_line(line, stream_request)
+
+    def parse_lines():
+        # The aiter_lines + json.loads path OllamaProvider.stream used before the splitter.
+        for line in ndjson.decode("utf-8").splitlines():
+            if not line:
+                continue
+            data = json.loads(line)
+            message = data.get("message") or {}
+            content = message.get("content") or ""
+            if not data.get("done") and content:
+                StreamChunk(content=content)
+
+    benchmarks["stream_parse_bytes[32]"] = parse_bytes
+    benchmarks["stream_parse_lines[32]"] = parse_lines
+
+    pricing_rows = [
+        {"model": f"model-{i}", "input_per_1k": 0.001, "output_per_1k": 0.002, "cached_per_1k": 0.0005}
+        for i in range(50)
+    ]
+    pricing_map = merge_pricing(pricing_rows)
+    benchmarks["merge_pricing[50]"] = lambda: merge_pricing(pricing_rows)
+    benchmarks["cost_usd"] = lambda: cost_usd("model-7", 512, 128, 0, pricing_map)
+    benchmarks["cost_usd[default]"] = lambda: cost_usd("mock-1", 512, 128)
+
+    benchmarks["hash_api_key"] = lambda: hash_api_key("sk-loadtest-0123456789abcdef0123456789abcdef")
+
+    health = ProviderHealth(window_size=50, min_samples=5)
+    for i in range(50):
+        health.record("primary", i % 7 != 0)
+    policy = RoutingPolicy(error_rate_threshold=0.5)
+    benchmarks["health_error_rate[50]"] = lambda: health.error_rate("primary")
+    benchmarks["routing_choose"] = lambda: policy.choose("pro", health)
+
+    benchmarks["metrics_scrape"] = generate_latest
+    return benchmarks
+
+
+def tenant_cardinality(tenants: int, limit: int | None) -> dict:
+    sys.path.insert(0, str(REPO_ROOT))
+    from prometheus_client import CollectorRegistry, Counter, generate_latest
+
+    from app.cardinality import BoundedLabelSet
+
+    # Same names and label sets as the tenant-labelled counters in app.main.
+    tracemalloc.start()
+    registry = CollectorRegistry()
+    by_tier = [
+        Counter(name, name, ["tenant", "tier"], registry=registry)
+        for name in ("tenant_requests_total", "tenant_tokens_total", "tenant_cost_total")
+    ]
+    by_model = [
+        Counter(name, name, ["tenant", "model"], registry=registry)
+        for name in ("cache_hits_total", "cache_misses_total")
+    ]
+    label = BoundedLabelSet(limit) if limit is not None else str
+    for i in range(tenants):
+        tenant = label(f"tenant-{i:06d}")
+        for counter in by_tier:
+            counter.labels(tenant, "free").inc()
+        for counter in by_model:
+            counter.labels(tenant, "mock-1").inc()
+    memory_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    body = generate_latest(registry)
+    scrape_s = time.perf_counter() - started
+    series = sum(len(metric.samples) for metric in registry.collect())
+    return {
+        "tenants": tenants,
+        "label_limit": limit,
+        "series": series,
+        "scrape_bytes": len(body),
+        "scrape_ms": round(scrape_s * 1000, 1),
+        "metrics_memory_bytes": memory_bytes,
+    }
+
+
+def measure(fn, repeat: int, min_time_s: float) -> dict:
+    timer = timeit.Timer(fn)
+    loops, elapsed = timer.autorange()
+    if elapsed < min_time_s:
+        loops = max(loops, int(loops * min_time_s / max(elapsed, 1e-9)))
+    runs = [seconds / loops * 1e9 for seconds in timer.repeat(repeat=repeat, number=loops)]
+    return {
+        "loops": loops,
+        "ns_per_op_min": round(min(runs), 1),
+        "ns_per_op_median": round(statistics.median(runs), 1),
+    }
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=REPO_ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Microbenchmarks for gateway hot-path functions.")
+    parser.add_argument("--filter", help="Only run benchmarks whose name contains this string")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--min-time", type=float, default=0.2)
+    parser.add_argument("--output", help="Defaults to benchmarks/results/microbench-<commit>.json")
+    parser.add_argument("--compare", help="Previous results file to compare against")
+    parser.add_argument(
+        "--tenants",
+        type=int,
+        default=0,
+        help="Also compare /metrics size and memory for this many synthetic tenants",
+    )
+    parser.add_argument("--tenant-limit", type=int, default=500)
+    args = parser.parse_args(argv)
+
+    benchmarks = build_benchmarks()
+    results = {}
+    for name, fn in benchmarks.items():
+        if args.filter and args.filter not in name:
+            continue
+        results[name] = measure(fn, args.repeat, args.min_time)
+        print(f"{name:28s} {results[name]['ns_per_op_min']:>14,.1f} ns/op", file=sys.stderr)
+
+    commit = _git_commit()
+    report = {
+        "commit": commit,
+        "created": int(time.time()),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "results": results,
+    }
+    if args.tenants:
+        report["cardinality"] = {
+            "unbounded": tenant_cardinality(args.tenants, None),
+            "bounded": tenant_cardinality(args.tenants, args.tenant_limit),
+        }
+        for name, row in report["cardinality"].items():
+            print(
+                f"{name:10s} series={row['series']:>9,} scrape={row['scrape_bytes']:>12,} B "
+                f"{row['scrape_ms']:>8,.1f} ms memory={row['metrics_memory_bytes']:>12,} B",
+                file=sys.stderr,
+            )
+    output = Path(args.output) if args.output else RESULTS_DIR / f"microbench-{commit or 'local'}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+    print(f"wrote {output}", file=sys.stderr)
+
+    if args.compare:
+        previous = json.loads(Path(args.compare).read_text(encoding="utf-8")).get("results", {})
+        for name, current in results.items():
+            before = previous.get(name)
+            if before:
+                ratio = current["ns_per_op_min"] / before["ns_per_op_min"]
+                print(f"{name:28s} {ratio:6.2f}x", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
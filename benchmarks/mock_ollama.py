@@ -0,0 +1,315 @@
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from dataclasses import dataclass, fields
+from datetime import datetime, timezone
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BENCH_DEFAULTS = {"tokens_per_s": 0.0, "ttft_ms": 0.0, "output_tokens": 512}
+_WORDS = ("the", "gateway", "routes", "each", "request", "to", "a", "healthy", "model", "and", "streams", "tokens")
+
+
+@dataclass
+class MockOllamaConfig:
+    tokens_per_s: float = 50.0
+    ttft_ms: float = 100.0
+    output_tokens: int = 64
+    error_rate: float = 0.0
+    stream_error_rate: float = 0.0
+    stall_rate: float = 0.0
+    stall_after_tokens: int = 8
+    stall_s: float = 30.0
+    split_writes: bool = False
+    version: str = "0.5.0-mock"
+    seed: int | None = None
+
+
+class MockOllama:
+    def __init__(self, config: MockOllamaConfig | None = None) -> None:
+        self.config = config or MockOllamaConfig()
+        self._rng = random.Random(self.config.seed)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+        if scope["method"] == "GET" and scope["path"] == "/api/version":
+            await self._json(send, 200, {"version": self.config.version})
+            return
+        if scope["method"] == "POST" and scope["path"] == "/api/chat":
+            body = b""
+            while True:
+                message = await receive()
+                body += message.get("body", b"")
+                if not message.get("more_body", False):
+                    break
+            await self._chat(json.loads(body or b"{}"), send)
+            return
+        await self._json(send, 404, {"error": "not found"})
+
+    async def _json(self, send, status: int, payload: dict) -> None:
+        body = json.dumps(payload).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": status,
+                "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    async def _chat(self, payload: dict, send) -> None:
+        config = self.config
+        model = payload.get("model", "mock")
+        num_predict = (payload.get("options") or {}).get("num_predict")
+        output_tokens = max(1, min(num_predict or config.output_tokens, config.output_tokens))
+        prompt_tokens = max(1, sum(len(m.get("content", "")) for m in payload.get("messages", [])) // 4)
+        started = time.perf_counter()
+
+        if config.error_rate > 0 and self._rng.random() < config.error_rate:
+            await asyncio.sleep(config.ttft_ms / 1000)
+            await self._json(send, 500, {"error": "mock ollama failure"})
+            return
+        abort_at = output_tokens // 2 if self._rng.random() < config.stream_error_rate else None
+        stall_at = config.stall_after_tokens if self._rng.random() < config.stall_rate else None
+        token_delay = 1 / config.tokens_per_s if config.tokens_per_s > 0 else 0.0
+
+        await asyncio.sleep(config.ttft_ms / 1000)
+        if not payload.get("stream", True):
+            await asyncio.sleep(token_delay * output_tokens)
+            content = " ".join(_WORDS[i % len(_WORDS)] for i in range(output_tokens))
+            await self._json(send, 200, self._final(model, content, prompt_tokens, output_tokens, started))
+            return
+
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 200,
+                "headers": [(b"content-type", b"application/x-ndjson")],
+            }
+        )
+        for i in range(output_tokens):
+            if i == abort_at:
+                raise RuntimeError("mock ollama aborted stream")
+            if i == stall_at:
+                await asyncio.sleep(config.stall_s)
+            if i and token_delay:
+                await asyncio.sleep(token_delay)
+            word = _WORDS[i % len(_WORDS)] + ("" if i == output_tokens - 1 else " ")
+            line = json.dumps(
+                {
+                    "model": model,
+                    "created_at": _now(),
+                    "message": {"role": "assistant", "content": word},
+                    "done": False,
+                }
+            ).encode() + b"\n"
+            await self._write(send, line)
+        final = self._final(model, "", prompt_tokens, output_tokens, started)
+        await self._write(send, json.dumps(final).encode() + b"\n")
+        await send({"type": "http.response.body", "body": b"", "more_body": False})
+
+    async def _write(self, send, line: bytes) -> None:
+        if self.config.split_writes and len(line) > 1:
+            middle = len(line) // 2
+            await send({"type": "http.response.body", "body": line[:middle], "more_body": True})
+            line = line[middle:]
+        await send({"type": "http.response.body", "body": line, "more_body": True})
+
+    def _final(self, model: str, content: str, prompt_tokens: int, output_tokens: int, started: float) -> dict:
+        return {
+            "model": model,
+            "created_at": _now(),
+            "message": {"role": "assistant", "content": content},
+            "done": True,
+            "done_reason": "stop",
+            "total_duration": int((time.perf_counter() - started) * 1e9),
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": output_tokens,
+        }
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+async def _serve_process(args, config: MockOllamaConfig):
+    # The mock runs in its own process so process_time() below only counts the client path.
+    import httpx
+
+    argv = [sys.executable, "-m", "benchmarks.mock_ollama", "serve", "--host", args.host, "--port", str(args.port)]
+    for field in fields(MockOllamaConfig):
+        value = getattr(config, field.name)
+        flag = "--" + field.name.replace("_", "-")
+        if field.type == "bool":
+            argv += [flag] if value else []
+        elif value is not None:
+            argv += [flag, str(value)]
+    server = await asyncio.create_subprocess_exec(*argv, cwd=REPO_ROOT)
+    async with httpx.AsyncClient() as client:
+        while True:
+            if server.returncode is not None:
+                raise RuntimeError("mock ollama server exited")
+            try:
+                await client.get(f"http://{args.host}:{args.port}/api/version")
+                return server
+            except httpx.TransportError:
+                await asyncio.sleep(0.05)
+
+
+async def _line_stream(base_url: str, request):
+    # The json.loads-per-line path OllamaProvider.stream used before the byte-level splitter.
+    import httpx
+
+    from app.provider import StreamChunk
+
+    payload = {"model": request.model, "messages": [m.model_dump() for m in request.messages], "stream": True}
+    async with httpx.AsyncClient(timeout=None) as client:
+        async with client.stream("POST", f"{base_url}/api/chat", json=payload) as resp:
+            resp.raise_for_status()
+            async for line in resp.aiter_lines():
+                if not line:
+                    continue
+                data = json.loads(line)
+                message = data.get("message") or {}
+                content = message.get("content") or ""
+                if data.get("done"):
+                    yield StreamChunk(content=content, done=True, model=data.get("model", request.model))
+                elif content:
+                    yield StreamChunk(content=content)
+
+
+def _envelope_frames():
+    from app.streaming import SSEEnvelope
+
+    envelope = SSEEnvelope("0f8fad5b-d9cb-469f-a165-70867728950e", "llama3.1:8b", 1700000000)
+    return envelope.content
+
+
+def _dict_frames():
+    # chat_stream's per-token dict + json.dumps framing from before SSEEnvelope.
+    def frame(content: str) -> str:
+        payload = {
+            "id": "0f8fad5b-d9cb-469f-a165-70867728950e",
+            "model": "llama3.1:8b",
+            "created": 1700000000,
+            "content": content,
+            "done": False,
+        }
+        return f"data: {json.dumps(payload, separators=(',', ':'))}\n\n"
+
+    return frame
+
+
+async def _run_path(stream, frame, request, streams: int) -> dict:
+    errors = 0
+
+    async def consume() -> int:
+        nonlocal errors
+        chunks = 0
+        try:
+            async for chunk in stream(request):
+                if chunk.content:
+                    frame(chunk.content)
+                chunks += 1
+        except Exception:
+            errors += 1
+        return chunks
+
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    counts = await asyncio.gather(*(consume() for _ in range(streams)))
+    elapsed = time.perf_counter() - start
+    cpu = time.process_time() - cpu_start
+    chunks = sum(counts)
+    return {
+        "elapsed_s": round(elapsed, 3),
+        "cpu_s": round(cpu, 3),
+        "chunks": chunks,
+        "chunks_per_s": round(chunks / elapsed, 1) if elapsed > 0 else 0.0,
+        "cpu_tokens_per_s_per_core": round(chunks / cpu, 1) if cpu > 0 else 0.0,
+        "errors": errors,
+    }
+
+
+async def _bench(args, config: MockOllamaConfig) -> dict:
+    sys.path.insert(0, str(REPO_ROOT))
+    from app.ollama_provider import OllamaProvider
+    from app.schemas import ChatRequest
+
+    base_url = f"http://{args.host}:{args.port}"
+    server = await _serve_process(args, config)
+    provider = OllamaProvider(base_url=base_url)
+    request = ChatRequest(model="llama3.1:8b", messages=[{"role": "user", "content": "benchmark"}])
+    paths = {
+        "bytes": (provider.stream, _envelope_frames()),
+        "lines": (lambda request: _line_stream(base_url, request), _dict_frames()),
+    }
+    results = {}
+    try:
+        # Warm both paths once so imports and connection setup are not measured.
+        for stream, frame in paths.values():
+            await _run_path(stream, frame, request, 1)
+        for name, (stream, frame) in paths.items():
+            results[name] = await _run_path(stream, frame, request, args.streams)
+    finally:
+        server.terminate()
+        await server.wait()
+    lines_cpu = results["lines"]["cpu_tokens_per_s_per_core"]
+    return {
+        "streams": args.streams,
+        "output_tokens": config.output_tokens,
+        "tokens_per_s": config.tokens_per_s,
+        "ttft_ms": config.ttft_ms,
+        "paths": results,
+        "cpu_speedup": round(results["bytes"]["cpu_tokens_per_s_per_core"] / lines_cpu, 2) if lines_cpu else None,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Local mock of the Ollama /api/chat and /api/version endpoints.")
+    parser.add_argument("command", choices=("serve", "bench"))
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="Defaults to 11434 for serve and 11535 for bench")
+    parser.add_argument("--streams", type=int, default=20, help="Concurrent streams for the bench command")
+    for field in fields(MockOllamaConfig):
+        flag = "--" + field.name.replace("_", "-")
+        if field.type == "bool":
+            parser.add_argument(flag, action="store_true")
+        else:
+            kind = {"float": float, "int": int, "str": str, "int | None": int}[field.type]
+            parser.add_argument(flag, type=kind)
+    args = parser.parse_args(argv)
+    # bench defaults to no pacing so it measures the client parser, not the mock's sleeps.
+    defaults = BENCH_DEFAULTS if args.command == "bench" else {}
+    values = {}
+    for field in fields(MockOllamaConfig):
+        value = getattr(args, field.name)
+        values[field.name] = value if value is not None else defaults.get(field.name, field.default)
+    config = MockOllamaConfig(**values)
+
+    if args.command == "serve":
+        import uvicorn
+
+        uvicorn.run(MockOllama(config), host=args.host, port=args.port or 11434, log_level="warning")
+        return 0
+    args.port = args.port or 11535
+    print(json.dumps(asyncio.run(_bench(args, config)), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,94 @@
+from __future__ import annotations
+
+import fnmatch
+import time
+
+
+class InMemoryRedis:
+    def __init__(self) -> None:
+        self._data: dict[str, str] = {}
+        self._expires: dict[str, float] = {}
+
+    def _live(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.monotonic():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return key in self._data
+
+    async def get(self, key: str) -> str | None:
+        return self._data.get(key) if self._live(key) else None
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        return [await self.get(key) for key in keys]
+
+    async def set(self, key: str, value, ex: int | None = None, nx: bool = False) -> bool | None:
+        if nx and self._live(key):
+            return None
+        self._data[key] = str(value)
+        if ex is not None:
+            self._expires[key] = time.monotonic() + ex
+        else:
+            self._expires.pop(key, None)
+        return True
+
+    async def incrby(self, key: str, amount: int) -> int:
+        value = int(await self.get(key) or 0) + amount
+        self._data[key] = str(value)
+        return value
+
+    async def incr(self, key: str) -> int:
+        return await self.incrby(key, 1)
+
+    async def expire(self, key: str, seconds: int) -> bool:
+        if not self._live(key):
+            return False
+        self._expires[key] = time.monotonic() + seconds
+        return True
+
+    async def delete(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            if self._live(key):
+                removed += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return removed
+
+    async def publish(self, channel: str, message) -> int:
+        return 0
+
+    async def scan_iter(self, match: str = "*"):
+        for key in list(self._data):
+            if self._live(key) and fnmatch.fnmatchcase(key, match):
+                yield key
+
+    async def close(self) -> None:
+        return None
+
+
+def seed_database(tenants: list[tuple[str, str]]) -> dict[str, str]:
+    from app.auth import hash_api_key
+    from app.db.base import Base
+    from app.db.models import ApiKey, Tenant
+    from app.db.session import engine, get_session
+
+    Base.metadata.create_all(engine)
+    keys: dict[str, str] = {}
+    db = get_session()
+    try:
+        for name, tier in tenants:
+            tenant = db.query(Tenant).filter(Tenant.name == name).one_or_none()
+            if tenant is None:
+                tenant = Tenant(name=name, tier=tier)
+                db.add(tenant)
+                db.flush()
+            raw_key = f"loadtest-{name}"
+            key_hash = hash_api_key(raw_key)
+            if db.query(ApiKey).filter(ApiKey.key_hash == key_hash).one_or_none() is None:
+                db.add(ApiKey(tenant_id=tenant.id, name="loadtest", key_hash=key_hash, active=True))
+            keys[name] = raw_key
+        db.commit()
+    finally:
+        db.close()
+    return keys
@@ -36,5 +36,10 @@ done
 echo "Running migrations..."
 poetry run alembic upgrade head
 
+if [ -n "$PROMETHEUS_MULTIPROC_DIR" ]; then
+  rm -rf "$PROMETHEUS_MULTIPROC_DIR"
+  mkdir -p "$PROMETHEUS_MULTIPROC_DIR"
+fi
+
 echo "Starting server..."
-exec poetry run uvicorn app.main:app --host 0.0.0.0 --port 8000
+exec poetry run uvicorn app.main:app --host 0.0.0.0 --port 8000 --workers "${UVICORN_WORKERS:-1}"
@@ -10,6 +10,10 @@ type ApiKeyEntry = {
   created_at: string;
 };
 
+type ApiKeyPage = { keys: ApiKeyEntry[]; next_cursor: string | null };
+
+const API_KEYS_PAGE_SIZE = 100;
+
 function useLocalStorage(key: string, initialValue: string) {
   const [value, setValue] = useState(() => {
     const stored = window.localStorage.getItem(key);
@@ -44,6 +48,8 @@ export default function App() {
   const [apiKeys, setApiKeys] = useState<ApiKeyEntry[]>([]);
   const [apiKeysError, setApiKeysError] = useState<string | null>(null);
   const [apiKeysLoading, setApiKeysLoading] = useState(false);
+  const [apiKeysCursor, setApiKeysCursor] = useState<string | null>(null);
+  const [apiKeysLoadingMore, setApiKeysLoadingMore] = useState(false);
   const [bootstrapKey, setBootstrapKey] = useState<string | null>(null);
   const [bootstrapError, setBootstrapError] = useState<string | null>(null);
   const [rotateError, setRotateError] = useState<string | null>(null);
@@ -258,7 +264,7 @@ export default function App() {
       setApiKeysError(null);
     }
     try {
-      const res = await fetch(`${baseUrl}/v1/admin/keys`, {
+      const res = await fetch(`${baseUrl}/v1/admin/keys?limit=${API_KEYS_PAGE_SIZE}`, {
         method: "GET",
         headers: {
           Authorization: `Bearer ${keyToUse}`
@@ -271,6 +277,7 @@ export default function App() {
         }
         if (!silent) {
           setApiKeys([]);
+          setApiKeysCursor(null);
         }
         if (res.status === 401 || res.status === 403) {
           setApiKeysReady(true);
@@ -295,13 +302,15 @@ export default function App() {
           }
           setAdminKey("");
           setApiKeys([]);
+          setApiKeysCursor(null);
           setApiKeysError("Admin key is invalid. Generate a new admin key.");
         }
         setApiKeysLoading(false);
         return false;
       }
-      const data = (await res.json()) as { keys: ApiKeyEntry[] };
-      setApiKeys(data.keys);
+      const page = (await res.json()) as ApiKeyPage;
+      setApiKeys(page.keys);
+      setApiKeysCursor(page.next_cursor);
       setApiKeysError(null);
       setApiKeysReady(true);
       return true;
@@ -316,6 +325,35 @@ export default function App() {
     }
   };
 
+  const loadMoreApiKeys = async () => {
+    if (!adminKey || !apiKeysCursor) {
+      return;
+    }
+    setApiKeysLoadingMore(true);
+    try {
+      const query = `?limit=${API_KEYS_PAGE_SIZE}&cursor=${encodeURIComponent(apiKeysCursor)}`;
+      const res = await fetch(`${baseUrl}/v1/admin/keys${query}`, {
+        method: "GET",
+        headers: {
+          Authorization: `Bearer ${adminKey}`
+        }
+      });
+      if (!res.ok) {
+        const err = await readError(res);
+        setApiKeysError(`${err.code}: ${err.message}`);
+        return;
+      }
+      const page = (await res.json()) as ApiKeyPage;
+      setApiKeys((prev) => [...prev, ...page.keys]);
+      setApiKeysCursor(page.next_cursor);
+    } catch (err) {
+      const message = err instanceof Error ? err.message : "Unknown error";
+      setApiKeysError(message);
+    } finally {
+      setApiKeysLoadingMore(false);
+    }
+  };
+
   const createApiKey = async () => {
     if (!adminKey) {
       setApiKeysError("Generate an admin key first.");
@@ -437,6 +475,7 @@ export default function App() {
       loadPricing();
     } else {
       setApiKeys([]);
+      setApiKeysCursor(null);
       setApiKeysError(null);
       setApiKeysReady(true);
     }
@@ -532,7 +571,7 @@ export default function App() {
                 <label>API Keys</label>
                 <div className="row" style={{ marginBottom: 12, columnGap: 16 }}>
                   <div>
-                    <div className="pill">DB Keys</div>
+                    <div className="pill">Loaded Keys</div>
                     <div className="value">{apiKeys.length}</div>
                   </div>
                   <div>
@@ -591,6 +630,17 @@ export default function App() {
                   })}
                   </div>
                 )}
+                {!apiKeysLoading && apiKeysCursor && (
+                  <button
+                    className="button secondary"
+                    disabled={apiKeysLoadingMore}
+                    onClick={loadMoreApiKeys}
+                    style={{ marginTop: 12 }}
+                    type="button"
+                  >
+                    {apiKeysLoadingMore ? "Loading..." : "Load more"}
+                  </button>
+                )}
               </div>
             </div>
           </div>